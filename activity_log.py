@@ -0,0 +1,77 @@
+# activity_log.py (v1.1)
+import json
+import logging
+import os
+import threading
+from collections import deque
+from itertools import islice
+from datetime import datetime
+
+DEFAULT_MAX_ENTRIES = 200
+DEFAULT_JOURNAL_PATH = "activity_journal.jsonl"
+
+class ActivityLog:
+    """
+    Per-session ring buffer of operation results, newest first.
+    Appends are O(1) and the oldest entries fall off once `max_entries` is reached.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self._entries = deque(maxlen=max_entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, entry):
+        self._entries.appendleft(entry)
+
+    def latest(self):
+        return self._entries[0] if self._entries else None
+
+    def clear(self):
+        self._entries.clear()
+
+    def page(self, page_number, page_size, query=""):
+        """Returns (entries, total_matches) for one page, filtered by a case-insensitive query."""
+        query = query.strip().lower()
+        if query:
+            matches = [e for e in self._entries if query in e.get('message', '').lower()
+                       or query in str(e.get('wip', '')).lower() or query in e.get('operation', '').lower()]
+        else:
+            matches = self._entries
+        start = page_number * page_size
+        return list(islice(matches, start, start + page_size)), len(matches)
+
+class ResultJournal:
+    """Append-only JSON Lines journal of structured operation results, shared by all sessions."""
+    def __init__(self, path=DEFAULT_JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        line = json.dumps(entry, default=str)
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logging.error(f"Could not write to activity journal {self.path}: {e}")
+
+def build_entry(operation, wip, device_name, result, duration):
+    """Builds the structured record stored in both the ring buffer and the journal."""
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "operation": operation,
+        "wip": wip,
+        "device_name": device_name,
+        "success": bool(result.get('success')),
+        "queued": bool(result.get('queued')),
+        "message": result.get('message', ''),
+        "steps": result.get('steps', []),
+        "duration_s": round(duration, 3),
+    }
+
+def journal_from_config(config):
+    settings = config.get('activity_log', {})
+    path = settings.get('journal_path', DEFAULT_JOURNAL_PATH)
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    return ResultJournal(path)
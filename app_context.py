@@ -1,5 +1,26 @@
-# app_context.py (v2.20)
+# app_context.py (v2.22)
 import logging
+from activity_log import journal_from_config
+
+TAG_MAP = {
+    "HEATER_SWAP_TAGS": "Heater Board Replacement",
+    "ORDER_HOLD_TAG": "Order Hold", "DOG_TAG": "DOG",
+    "DEVICE_COMPLETE_TAG": "Device Calibrated", "COR_TAG": "Return Unrepaired",
+    "PURGE_TAG": "PURGE", "BAD_SENSOR_TAG": "Bad Sensor",
+    "PRESSURE_OSCILLATION_TAG": "Pressure Oscillation", "INTERNAL_LEAK_TAG": "INTERNAL LEAK",
+    "CONTAMINATED_TAG": "CONTAMINATED", "POSITIVE_READ_ERROR_TAG": "Positive Read Error",
+    "RANGE_ERROR_TAG": "Range Error",
+    "NEGATIVE_READ_ERROR_TAG": "Negative ReadError", # Reverted to be consistent
+    "PHYSICALLY_DAMAGED_TAG": "Physically Damaged", "DRIFTING_TAG": "DRIFTING",
+    "CLEANED_TAG": "Cleaned"
+}
+
+# Tags that record why a device was held, returned or flagged.
+REASON_TAG_KEYS = (
+    "ORDER_HOLD_TAG", "DOG_TAG", "COR_TAG", "BAD_SENSOR_TAG", "PRESSURE_OSCILLATION_TAG",
+    "INTERNAL_LEAK_TAG", "CONTAMINATED_TAG", "POSITIVE_READ_ERROR_TAG", "RANGE_ERROR_TAG",
+    "NEGATIVE_READ_ERROR_TAG", "PHYSICALLY_DAMAGED_TAG", "DRIFTING_TAG"
+)
 
 class AppContext:
     """A centralized object to hold application state and configuration."""
@@ -7,6 +28,7 @@ class AppContext:
         self.client = asana_client
         self.config = full_config_data
         self.gids = {}
+        self.journal = journal_from_config(full_config_data)
         self.resolve_gids()
 
     def find_gids_by_name(self, item_list, name):
@@ -45,19 +67,7 @@ class AppContext:
                 if sec_gids: self.gids[key] = sec_gids[0]
                 else: logging.warning(f"Configuration Warning: Section '{name}' not found."); self.gids[key] = None
 
-        tag_map = {
-            "HEATER_SWAP_TAGS": "Heater Board Replacement",
-            "ORDER_HOLD_TAG": "Order Hold", "DOG_TAG": "DOG",
-            "DEVICE_COMPLETE_TAG": "Device Calibrated", "COR_TAG": "Return Unrepaired",
-            "PURGE_TAG": "PURGE", "BAD_SENSOR_TAG": "Bad Sensor",
-            "PRESSURE_OSCILLATION_TAG": "Pressure Oscillation", "INTERNAL_LEAK_TAG": "INTERNAL LEAK",
-            "CONTAMINATED_TAG": "CONTAMINATED", "POSITIVE_READ_ERROR_TAG": "Positive Read Error",
-            "RANGE_ERROR_TAG": "Range Error",
-            "NEGATIVE_READ_ERROR_TAG": "Negative ReadError", # Reverted to be consistent
-            "PHYSICALLY_DAMAGED_TAG": "Physically Damaged", "DRIFTING_TAG": "DRIFTING",
-            "CLEANED_TAG": "Cleaned"
-        }
-        for key, name in tag_map.items():
+        for key, name in TAG_MAP.items():
             gids = self.find_gids_by_name(all_tags, name)
             if not gids:
                 logging.warning(f"Configuration Warning: Tag '{name}' not found in Asana.")
@@ -1,18 +1,165 @@
-# asana_api_client.py (v2.13)
+# asana_api_client.py (v2.22)
 import os
+import re
 import requests
 import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from asana_error_handler import handle_api_error
+from asana_resilience import LatencyTracker, HedgeBudget, CircuitBreaker, WriteRetryQueue, CLOSED
+from asana_records import Task
+from response_cache import ResponseCache
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
 
 BASE_URL = "https://app.asana.com/api/1.0"
+DEFAULT_SESSION = "default"
+PAGE_LIMIT = 100
+GID_PATTERN = re.compile(r"\d{6,}")
+
+class _InFlight:
+    """An identical GET that is already on the wire; followers wait on it."""
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
 
 class AsanaClient:
-    def __init__(self, token, workspace_id):
+    """
+    Thin Asana REST wrapper. One instance is shared by every browser session
+    (see initialize_app), so it is safe to call from multiple threads:
+    identical in-flight GETs are coalesced into a single request, and each
+    session may only hold `per_session_limit` of the `max_concurrent`
+    request slots so one long cart move cannot starve the other stations.
+    Task reads are served from a TTL/LRU cache that every write method
+    invalidates for the tasks, tags and sections it touches.
+
+    Timeouts follow each endpoint's observed latency, slow GETs are hedged
+    with a duplicate request, and a circuit breaker fails fast during an
+    Asana outage, parking writes in a retry queue until it recovers.
+    While that queue is non-empty, new writes join it so they land in order.
+    Short-lived callers that exit before the queue drains pass
+    `queue_writes=False` so those writes fail instead of being lost.
+    """
+    def __init__(self, token, workspace_id, max_concurrent=8, per_session_limit=3, cache_ttl=30, cache_size=512, queue_writes=True):
         self.token = token
         self.workspace_id = workspace_id
         self.base_url = BASE_URL
+        self.per_session_limit = per_session_limit
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._session_slots = weakref.WeakValueDictionary()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.cache = ResponseCache(ttl=cache_ttl, max_entries=cache_size)
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.hedge_budget = HedgeBudget()
+        self.queue_writes = queue_writes
+        self.retry_queue = WriteRetryQueue(self.breaker, self._replay_write)
+        # Room for every slot's GET plus its duplicate: a losing request keeps its worker until it finishes.
+        self._hedge_pool = ThreadPoolExecutor(max_workers=2 * max_concurrent, thread_name_prefix="asana-hedge")
+
+    def bind_session(self, session_id):
+        """Attributes requests made from the current thread to `session_id`."""
+        self._local.session_id = session_id or DEFAULT_SESSION
+
+    def current_session(self):
+        """Returns the session bound to the current thread, for handing on to worker threads."""
+        return getattr(self._local, "session_id", DEFAULT_SESSION)
+
+    def _session_semaphore(self):
+        session_id = self.current_session()
+        with self._lock:
+            semaphore = self._session_slots.get(session_id)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_session_limit)
+                self._session_slots[session_id] = semaphore
+            return semaphore
+
+    def _make_request(self, method, endpoint, params=None, data=None, files=None, gids=()):
+        if method != 'GET':
+            return self._send(method, endpoint, params, data, files, gids)
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        with self._lock:
+            inflight = self._inflight.get(key)
+            is_leader = inflight is None
+            if is_leader:
+                inflight = self._inflight[key] = _InFlight()
+        if not is_leader:
+            inflight.event.wait()
+            return inflight.result
+        try:
+            inflight.result = self._send(method, endpoint, params, data, files)
+        finally:
+            if inflight.result is None:
+                inflight.result = {"success": False, "message": f"Request failed during GET {endpoint}."}
+            with self._lock:
+                del self._inflight[key]
+            inflight.event.set()
+        return inflight.result
+
+    def _send(self, method, endpoint, params=None, data=None, files=None, gids=()):
+        if method != 'GET' and not files and len(self.retry_queue):
+            # Sent now, this write would land before the queued ones and their replay could undo it.
+            return self._fail_fast(method, endpoint, data, files, gids, reason="Earlier writes are still being retried.")
+        if not self.breaker.allow_request():
+            return self._fail_fast(method, endpoint, data, files, gids)
+        latency_key = f"{method} {GID_PATTERN.sub('{gid}', endpoint)}"
+        session_semaphore = self._session_semaphore()
+        with session_semaphore, self._slots:
+            if method != 'GET':
+                return self._request(method, endpoint, params, data, files)[0]
+            self.hedge_budget.record_request()
+            hedge_delay = self.latency.hedge_delay(latency_key)
+            # Without budget, or while Asana is degraded, the GET stays on this thread and off the hedge pool.
+            if hedge_delay is None or self.breaker.state != CLOSED or not self.hedge_budget.available():
+                return self._request(method, endpoint, params)[0]
+            return self._hedged_get(endpoint, params, hedge_delay)
+
+    def _hedged_get(self, endpoint, params, hedge_delay):
+        """Sends a duplicate GET if the first is still running after `hedge_delay`; the first success wins."""
+        started = threading.Event()
+
+        def primary():
+            started.set()
+            return self._request('GET', endpoint, params)
+        pending = {self._hedge_pool.submit(primary)}
+        # Time spent waiting for a pool worker is not Asana being slow, so it does not count toward the delay.
+        started.wait()
+        done, pending = wait(pending, timeout=hedge_delay)
+        if not done and self.breaker.state == CLOSED and self.hedge_budget.try_acquire():
+            logging.info(f"Hedging slow GET {endpoint} after {hedge_delay:.2f}s.")
+            pending.add(self._hedge_pool.submit(self._request, 'GET', endpoint, params))
+        while True:
+            for future in done:
+                result = future.result()[0]
+                if result["success"] or not pending: return result
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
 
-    def _make_request(self, method, endpoint, params=None, data=None, files=None):
+    def _fail_fast(self, method, endpoint, data, files, gids, reason="Asana is unavailable."):
+        if self.queue_writes and method != 'GET' and not files and self.retry_queue.put(method, endpoint, data, gids):
+            return {"success": False, "queued": True, "message": f"{reason} {method} {endpoint} was queued and will be retried automatically."}
+        return {"success": False, "message": f"{reason} {method} {endpoint} was not sent; please try again shortly."}
+
+    def _replay_write(self, method, endpoint, data, gids):
+        with self._slots:
+            result, is_outage = self._request(method, endpoint, data=data)
+        # Reads cached between recovery and this replay reflect the pre-write state.
+        if not is_outage: self.cache.invalidate(*gids)
+        return result, is_outage
+
+    def _request(self, method, endpoint, params=None, data=None, files=None):
+        """Performs one HTTP call and feeds the latency tracker and breaker. Returns (result, is_outage)."""
+        latency_key = f"{method} {GID_PATTERN.sub('{gid}', endpoint)}"
         url = f"{self.base_url}{endpoint}"
         headers = {"Authorization": f"Bearer {self.token}", "Accept": "application/json"}
         json_payload = None
@@ -21,54 +168,113 @@ class AsanaClient:
             headers["Content-Type"] = "application/json"
             json_payload = data
         
+        is_outage = True
+        timeout = self.latency.timeout_for(latency_key)
         try:
-            # --- CHANGE: Removed the unused 'data_payload' variable from the request call ---
-            response = requests.request(method, url, headers=headers, params=params, json=json_payload, files=files, timeout=30)
+            started = time.monotonic()
+            response = requests.request(method, url, headers=headers, params=params, json=json_payload, files=files, timeout=timeout)
+            self.latency.record(latency_key, time.monotonic() - started)
+            is_outage = response.status_code >= 500
             response.raise_for_status()
             if response.status_code == 204:
-                return {"success": True, "data": None}
-            return {"success": True, "data": response.json()}
-        except requests.exceptions.RequestException as e:
-            return handle_api_error(e, f"{method} {endpoint}")
-
-    def find_task_by_wip(self, wip_number, opt_fields="name,gid,parent,memberships"):
-        params = {"text": wip_number, "resource.type": "task", "opt_fields": opt_fields}
-        result = self._make_request('GET', f"/workspaces/{self.workspace_id}/tasks/search", params=params)
-        if result["success"] and result["data"]:
-            if result["data"].get("data"):
-                return {"success": True, "task_data": result["data"]["data"][0]}
+                return {"success": True, "data": None}, False
+            return {"success": True, "data": _json_loads(response.content)}, False
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # A timed-out call took at least `timeout`; recording it lets the timeout widen again when Asana slows down.
+            if isinstance(e, requests.exceptions.Timeout): self.latency.record(latency_key, timeout)
+            return handle_api_error(e, f"{method} {endpoint}"), is_outage
+        finally:
+            if is_outage: self.breaker.record_failure()
+            else: self.breaker.record_success()
+
+    def _cached_read(self, endpoint, params, fetch, cache_empty=True):
+        """
+        Serves a task read from the cache, or runs `fetch` and caches its result by the GIDs it mentions.
+        With `cache_empty=False` an empty task list is not cached, since no GID could invalidate it.
+        """
+        key = (endpoint, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None: return cached
+        generation = self.cache.generation()
+        result = fetch()
+        if result["success"] and (cache_empty or result.get("tasks", True)):
+            gids = set(GID_PATTERN.findall(endpoint))
+            for task in result.get("tasks") or [result.get("task")]:
+                if task: gids.update(gid for gid in (task.gid, task.parent_gid) if gid)
+            self.cache.put(key, result, gids, generation)
+        return result
+
+    def _write(self, method, endpoint, gids, data=None, files=None):
+        """Sends a write and drops cached reads for every GID it affects."""
+        result = self._make_request(method, endpoint, data=data, files=files, gids=gids)
+        self.cache.invalidate(*gids)
+        return result
+
+    def _get_tasks(self, endpoint, fields, params=None, paginate=False, cache_empty=True):
+        """GETs a list endpoint and returns its items as Task records, following next_page if asked."""
+        params = dict(params or {}, opt_fields=Task.opt_fields(fields))
+        if paginate: params["limit"] = PAGE_LIMIT
+
+        def fetch():
+            page_params, tasks = params, []
+            while True:
+                result = self._make_request('GET', endpoint, params=page_params)
+                if not result["success"]: return result
+                body = result["data"] or {}
+                tasks.extend(Task.from_dict(item) for item in body.get("data") or [])
+                next_page = body.get("next_page")
+                if not paginate or not next_page: break
+                page_params = dict(params, offset=next_page["offset"])
+            return {"success": True, "tasks": tasks}
+        return self._cached_read(endpoint, params, fetch, cache_empty)
+
+    def find_task_by_wip(self, wip_number, fields=("name", "parent_gid")):
+        params = {"text": wip_number, "resource.type": "task"}
+        # A miss is not cached: the task may be created moments after the first scan.
+        result = self._get_tasks(f"/workspaces/{self.workspace_id}/tasks/search", fields, params=params, cache_empty=False)
+        if result["success"]:
+            if result["tasks"]:
+                return {"success": True, "task": result["tasks"][0]}
             else:
                 return {"success": False, "message": f"No task found with WIP: '{wip_number}'."}
         return result
 
-    def get_tasks_by_tag(self, tag_gid, opt_fields="name,gid"):
+    def get_tasks_by_tag(self, tag_gid, fields=("name",), paginate=False):
         """Gets all tasks associated with a specific tag GID."""
-        params = {"opt_fields": opt_fields}
-        return self._make_request('GET', f"/tags/{tag_gid}/tasks", params=params)
+        return self._get_tasks(f"/tags/{tag_gid}/tasks", fields, paginate=paginate)
+
+    def get_task_details(self, task_gid, fields=("name",)):
+        endpoint, params = f"/tasks/{task_gid}", {"opt_fields": Task.opt_fields(fields)}
+
+        def fetch():
+            result = self._make_request('GET', endpoint, params=params)
+            if not result["success"]: return result
+            return {"success": True, "task": Task.from_dict((result["data"] or {}).get("data") or {})}
+        return self._cached_read(endpoint, params, fetch)
 
-    def get_task_details(self, task_gid, opt_fields="name,gid"):
-        return self._make_request('GET', f"/tasks/{task_gid}", params={"opt_fields": opt_fields})
+    def get_subtasks_for_task(self, parent_task_id, fields=("name",)):
+        return self._get_tasks(f"/tasks/{parent_task_id}/subtasks", fields)
 
-    def get_subtasks_for_task(self, parent_task_id):
-        return self._make_request('GET', f"/tasks/{parent_task_id}/subtasks", params={"opt_fields": "name,gid"})
+    def cache_stats(self):
+        return self.cache.stats()
 
     def add_tag_to_task(self, task_id, tag_id):
-        return self._make_request('POST', f"/tasks/{task_id}/addTag", data={"data": {"tag": tag_id}})
+        return self._write('POST', f"/tasks/{task_id}/addTag", (task_id, tag_id), data={"data": {"tag": tag_id}})
 
     def remove_tag_from_task(self, task_id, tag_id):
-        return self._make_request('POST', f"/tasks/{task_id}/removeTag", data={"data": {"tag": tag_id}})
+        return self._write('POST', f"/tasks/{task_id}/removeTag", (task_id, tag_id), data={"data": {"tag": tag_id}})
 
     def assign_task_to_user(self, task_id, assignee_gid):
-        return self._make_request('PUT', f"/tasks/{task_id}", data={"data": {"assignee": assignee_gid}})
+        return self._write('PUT', f"/tasks/{task_id}", (task_id,), data={"data": {"assignee": assignee_gid}})
 
     def add_comment_to_task(self, task_id, comment_text):
         return self._make_request('POST', f"/tasks/{task_id}/stories", data={"data": {"text": comment_text}})
 
     def change_task_name(self, task_id, new_name):
-        return self._make_request('PUT', f"/tasks/{task_id}", data={"data": {"name": new_name}})
+        return self._write('PUT', f"/tasks/{task_id}", (task_id,), data={"data": {"name": new_name}})
 
     def move_task_to_section(self, task_id, target_section_id):
-        return self._make_request('POST', f"/sections/{target_section_id}/addTask", data={"data": {"task": task_id}})
+        return self._write('POST', f"/sections/{target_section_id}/addTask", (task_id, target_section_id), data={"data": {"task": task_id}})
     
     def upload_attachment(self, parent_gid, file_data):
         logging.info(f"Uploading attachment to parent GID: {parent_gid}")
@@ -78,13 +284,13 @@ class AsanaClient:
             try:
                 with open(file_data, 'rb') as f:
                     files_payload = {'file': (os.path.basename(file_data), f)}
-                    return self._make_request('POST', f"/tasks/{parent_gid}/attachments", files=files_payload)
+                    return self._write('POST', f"/tasks/{parent_gid}/attachments", (parent_gid,), files=files_payload)
             except Exception as e:
                 return {"success": False, "message": f"Error reading file: {e}"}
         elif isinstance(file_data, dict):
             try:
                 files_payload = {'file': (file_data['file_name'], file_data['file_content'], file_data.get('content_type', 'application/octet-stream'))}
-                return self._make_request('POST', f"/tasks/{parent_gid}/attachments", files=files_payload)
+                return self._write('POST', f"/tasks/{parent_gid}/attachments", (parent_gid,), files=files_payload)
             except KeyError as e:
                 return {"success": False, "message": f"Missing required file data: {e}"}
             except Exception as e:
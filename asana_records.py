@@ -0,0 +1,114 @@
+# asana_records.py (v1.1)
+"""
+Compact, typed records built straight from Asana API responses.
+
+Each record declares FIELDS, mapping its attributes to the opt_fields paths
+that populate them, so a request only asks Asana for what the caller reads.
+Attributes that were not requested keep their defaults.
+"""
+
+class _Record:
+    __slots__ = ()
+    FIELDS = {}
+
+    @classmethod
+    def opt_fields(cls, attrs=None, prefix=None):
+        """Returns the opt_fields string for `attrs` (all attributes by default)."""
+        paths = []
+        for attr in attrs or cls.FIELDS:
+            for path in cls.FIELDS[attr]:
+                full_path = f"{prefix}.{path}" if prefix else path
+                if full_path not in paths: paths.append(full_path)
+        return ",".join(paths)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+class Tag(_Record):
+    __slots__ = ("gid", "name")
+    FIELDS = {"gid": ("gid",), "name": ("name",)}
+
+    def __init__(self, gid=None, name=""):
+        self.gid = gid
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('gid'), data.get('name') or "")
+
+class User(_Record):
+    __slots__ = ("gid", "name")
+    FIELDS = {"gid": ("gid",), "name": ("name",)}
+
+    def __init__(self, gid=None, name=""):
+        self.gid = gid
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('gid'), data.get('name') or "")
+
+class Section(_Record):
+    __slots__ = ("gid", "name", "project_gid")
+    FIELDS = {"gid": ("gid",), "name": ("name",), "project_gid": ("project.gid",)}
+
+    def __init__(self, gid=None, name="", project_gid=None):
+        self.gid = gid
+        self.name = name
+        self.project_gid = project_gid
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('gid'), data.get('name') or "", (data.get('project') or {}).get('gid'))
+
+    @classmethod
+    def from_membership(cls, membership):
+        section = membership.get('section') or {}
+        return cls(section.get('gid'), section.get('name') or "", (membership.get('project') or {}).get('gid'))
+
+class Task(_Record):
+    __slots__ = ("gid", "name", "parent_gid", "project_gids", "tags", "sections", "parent_sections", "assignee")
+    FIELDS = {
+        "gid": ("gid",),
+        "name": ("name",),
+        "parent_gid": ("parent",),
+        "project_gids": ("projects.gid",),
+        "tags": tuple(Tag.opt_fields(prefix="tags").split(",")),
+        "sections": ("memberships.project.gid", "memberships.section.gid", "memberships.section.name"),
+        # Subtasks are not project members; their parent carries the project and section.
+        "parent_sections": ("parent.memberships.project.gid", "parent.memberships.section.gid", "parent.memberships.section.name"),
+        "assignee": tuple(User.opt_fields(prefix="assignee").split(",")),
+    }
+
+    def __init__(self, gid=None, name="", parent_gid=None, project_gids=(), tags=(), sections=(), parent_sections=(), assignee=None):
+        self.gid = gid
+        self.name = name
+        self.parent_gid = parent_gid
+        self.project_gids = project_gids
+        self.tags = tags
+        self.sections = sections
+        self.parent_sections = parent_sections
+        self.assignee = assignee
+
+    @classmethod
+    def from_dict(cls, data):
+        parent = data.get('parent')
+        assignee = data.get('assignee')
+        return cls(
+            gid=data.get('gid'),
+            name=data.get('name') or "",
+            parent_gid=parent.get('gid') if parent else None,
+            project_gids=tuple(p['gid'] for p in data.get('projects', ())),
+            tags=tuple(Tag.from_dict(t) for t in data.get('tags', ())),
+            sections=tuple(Section.from_membership(m) for m in data.get('memberships', ()) if m.get('section')),
+            parent_sections=tuple(Section.from_membership(m) for m in (parent or {}).get('memberships', ()) if m.get('section')),
+            assignee=User.from_dict(assignee) if assignee else None,
+        )
+
+    @property
+    def tag_gids(self):
+        return {tag.gid for tag in self.tags}
+
+    def in_project(self, project_gid):
+        return project_gid is not None and project_gid in self.project_gids
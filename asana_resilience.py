@@ -0,0 +1,169 @@
+# asana_resilience.py (v1.1)
+import logging
+import threading
+import time
+from collections import deque
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class LatencyTracker:
+    """
+    Rolling per-endpoint latency samples. Timeouts and hedge delays follow the
+    observed percentiles once an endpoint has `min_samples`; until then the
+    fixed defaults apply.
+    """
+    def __init__(self, window=200, min_samples=20, default_timeout=30.0, min_timeout=5.0, max_timeout=30.0, min_hedge_delay=0.25):
+        self.window = window
+        self.min_samples = min_samples
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_hedge_delay = min_hedge_delay
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key, pct):
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < self.min_samples: return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def timeout_for(self, key):
+        p99 = self.percentile(key, 99)
+        if p99 is None: return self.default_timeout
+        return max(self.min_timeout, min(self.max_timeout, p99 * 4))
+
+    def hedge_delay(self, key):
+        """Returns how long to wait before sending a duplicate read, or None if there is no data yet."""
+        p95 = self.percentile(key, 95)
+        if p95 is None: return None
+        return max(self.min_hedge_delay, p95)
+
+class HedgeBudget:
+    """
+    Caps hedged duplicates to roughly `ratio` of requests: every request earns
+    `ratio` of a token (up to `max_tokens`) and every hedge spends a whole one,
+    so a broad slowdown cannot double the load on a degraded API.
+    """
+    def __init__(self, ratio=0.05, max_tokens=3.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def available(self):
+        return self._tokens >= 1.0
+
+    def try_acquire(self):
+        with self._lock:
+            if self._tokens < 1.0: return False
+            self._tokens -= 1.0
+            return True
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive outage failures (connection
+    errors, timeouts, 5xx) and fails fast for `reset_timeout` seconds. It then
+    lets a single probe through; the probe's outcome closes or re-opens it.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow_request(self):
+        with self._lock:
+            if self._state == CLOSED: return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED: logging.info("Asana circuit breaker closed; API is responding again.")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN: logging.warning(f"Asana circuit breaker opened after {self._failures} failures.")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+class WriteRetryQueue:
+    """
+    Holds writes rejected while the circuit is open and replays them in order
+    from a background thread once the breaker lets requests through again.
+    `send(method, endpoint, data, gids)` performs one write and returns
+    (result, is_outage); `gids` are the tasks/tags/sections the write touches
+    so the replay can invalidate cached reads. Writes that fail for other
+    reasons (e.g. a 4xx) are logged and dropped.
+    """
+    def __init__(self, breaker, send, max_size=500, poll_interval=2.0):
+        self.breaker = breaker
+        self.send = send
+        self.poll_interval = poll_interval
+        self._pending = deque()
+        self.max_size = max_size
+        self._lock = threading.Condition()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, method, endpoint, data, gids=()):
+        """Queues a write. Returns False if the queue is full."""
+        with self._lock:
+            if len(self._pending) >= self.max_size: return False
+            self._pending.append((method, endpoint, data, tuple(gids)))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._drain, name="asana-write-retry", daemon=True)
+                self._worker.start()
+            self._lock.notify()
+            return True
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                while not self._pending: self._lock.wait()
+                method, endpoint, data, gids = self._pending[0]
+            if not self.breaker.allow_request():
+                time.sleep(self.poll_interval)
+                continue
+            result, is_outage = self.send(method, endpoint, data, gids)
+            if is_outage:
+                time.sleep(self.poll_interval)
+                continue # Still down; keep the write at the head of the queue.
+            with self._lock:
+                self._pending.popleft()
+            if result["success"]:
+                logging.info(f"Replayed queued write {method} {endpoint}.")
+            else:
+                logging.error(f"Dropped queued write {method} {endpoint}: {result.get('message')}")
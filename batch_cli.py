@@ -0,0 +1,179 @@
+# batch_cli.py (v1.3)
+"""
+Headless batch runner for the standard operations.
+
+Usage:
+    python batch_cli.py heater-swap wips.txt
+    python batch_cli.py dog wips.csv --reason "Bad Sensor" --details "Failed leak check"
+    python batch_cli.py custom wips.txt --recipe "SUB:TAG:Cart 12;MAIN:MOVE:Standard WIP"
+
+The WIP file may be a plain list (one WIP per line) or a CSV whose first
+column holds the WIP; a header row named "wip" is skipped.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tomllib
+
+from asana_api_client import AsanaClient
+from app_context import AppContext
+from activity_log import build_entry
+from parsers import parse_recipe_formula
+from web_operations import (
+    STANDARD_REASONS,
+    build_reason_data,
+    process_heater_board_swap,
+    process_device_cleaned,
+    process_dog_operation,
+    process_cor_operation,
+    process_custom_operation,
+    process_wip_batch,
+)
+
+SECRETS_FILE = os.path.join(".streamlit", "secrets.toml")
+
+OPERATIONS = {
+    "heater-swap": process_heater_board_swap,
+    "cleaned": process_device_cleaned,
+    "dog": process_dog_operation,
+    "cor": process_cor_operation,
+    "custom": process_custom_operation,
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run an Asana Automation Portal operation for every WIP in a file.")
+    parser.add_argument("operation", choices=sorted(OPERATIONS), help="Operation to run for each WIP.")
+    parser.add_argument("wip_file", help="CSV or newline-separated file of WIP numbers.")
+    parser.add_argument("--config", default="config.json", help="Path to config.json (default: %(default)s).")
+    parser.add_argument("--token", help="Asana PAT. Defaults to $ASANA_TOKEN, then .streamlit/secrets.toml.")
+    parser.add_argument("--device-name", default="Batch CLI", help="Device name appended to comments (default: %(default)s).")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum WIPs processed in parallel (default: %(default)s).")
+    parser.add_argument("--report", default="batch_report.json", help="Where to write the JSON result report (default: %(default)s).")
+    parser.add_argument("--reason", choices=STANDARD_REASONS, help="Reason for dog/cor operations.")
+    parser.add_argument("--details", default="", help="Optional reason details for dog/cor operations.")
+    parser.add_argument("--order-hold-reason", default="", help="Marks a dog operation as an ORDER HOLD with this reason.")
+    parser.add_argument("--recipe", help="Barcode formula for the custom operation, e.g. 'SUB:TAG:Cleaned;MAIN:MOVE:RUSH'.")
+    args = parser.parse_args(argv)
+    if args.workers < 1: parser.error("--workers must be at least 1.")
+    if args.operation == "cor" and not args.reason: parser.error("The cor operation requires --reason.")
+    if args.operation == "custom" and not args.recipe: parser.error("The custom operation requires --recipe.")
+    return args
+
+def resolve_token(args):
+    if args.token: return args.token
+    if os.environ.get("ASANA_TOKEN"): return os.environ["ASANA_TOKEN"]
+    if os.path.exists(SECRETS_FILE):
+        with open(SECRETS_FILE, 'rb') as f: return tomllib.load(f).get("ASANA_TOKEN")
+    return None
+
+def read_wips(path):
+    """Returns the WIPs in file order, without blanks, the header row or duplicates."""
+    wips, seen = [], set()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            # Only the first column is the WIP; later columns may hold notes.
+            wip = row[0].strip() if row else ""
+            if not wip or wip.lower() == "wip": continue
+            if wip in seen:
+                logging.warning(f"Skipping duplicate WIP '{wip}'.")
+                continue
+            seen.add(wip)
+            wips.append(wip)
+    return wips
+
+def build_operation_args(args):
+    """Returns the arguments passed to the operation after the WIP number."""
+    if args.operation == "dog":
+        reason_data = build_reason_data(args.reason, args.details) if args.reason else None
+        return (reason_data, args.order_hold_reason, args.device_name)
+    if args.operation == "cor":
+        return (build_reason_data(args.reason, args.details), args.device_name)
+    if args.operation == "custom":
+        return (parse_recipe_formula(args.recipe), args.device_name)
+    return (args.device_name,)
+
+class Progress:
+    """Single-line progress display with live throughput, written to stderr."""
+    def __init__(self, total):
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, success):
+        with self._lock:
+            if success: self.succeeded += 1
+            else: self.failed += 1
+            done = self.succeeded + self.failed
+            elapsed = time.monotonic() - self.started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (self.total - done) / rate if rate else 0.0
+            sys.stderr.write(f"\r[{done}/{self.total}] ok {self.succeeded} | failed {self.failed} | {rate:.2f} WIP/s | ETA {eta:.0f}s ")
+            sys.stderr.flush()
+
+def run_batch(context, operation_func, wips, operation_args, workers, progress, operation_name, device_name):
+    entries = {}
+
+    def record(wip, result, duration):
+        entry = entries[wip] = build_entry(operation_name, wip, device_name, result, duration)
+        context.journal.write(entry)
+        progress.update(entry['success'])
+
+    process_wip_batch(context, wips, operation_func, *operation_args, max_workers=workers, on_result=record)
+    sys.stderr.write("\n")
+    return [entries[wip] for wip in wips]
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    args = parse_args(argv)
+    token = resolve_token(args)
+    if not token:
+        print("Error: No Asana token. Use --token, set ASANA_TOKEN or create .streamlit/secrets.toml.", file=sys.stderr)
+        return 2
+    if not os.path.exists(args.config):
+        print(f"Error: {args.config} not found.", file=sys.stderr)
+        return 2
+    with open(args.config, 'r') as f: config = json.load(f)
+    # The process exits when the batch ends, so writes refused during an outage are reported as failed, not queued.
+    client = AsanaClient(token=token, workspace_id=config.get("workspace_id"), max_concurrent=args.workers,
+                         per_session_limit=args.workers, queue_writes=False)
+    context = AppContext(client, config)
+    errors = context.resolve_gids()
+    if errors:
+        print(f"Critical Error: Could not find required GIDs: {', '.join(errors)}", file=sys.stderr)
+        return 2
+    try:
+        operation_args = build_operation_args(args)
+    except KeyError as e:
+        print(f"Error: Invalid recipe formula: {e}", file=sys.stderr)
+        return 2
+    wips = read_wips(args.wip_file)
+    if not wips:
+        print(f"Error: No WIPs found in {args.wip_file}.", file=sys.stderr)
+        return 2
+
+    progress = Progress(len(wips))
+    results = run_batch(context, OPERATIONS[args.operation], wips, operation_args, args.workers, progress, args.operation, args.device_name)
+    elapsed = time.monotonic() - progress.started
+    report = {
+        "operation": args.operation,
+        "device_name": args.device_name,
+        "total": len(results),
+        "succeeded": progress.succeeded,
+        "failed": progress.failed,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_wips_per_s": round(len(results) / elapsed, 3) if elapsed else None,
+        "results": results,
+    }
+    with open(args.report, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2, default=str)
+    print(f"{args.operation}: {progress.succeeded} succeeded, {progress.failed} failed in {elapsed:.1f}s. Report written to {args.report}.")
+    return 0 if progress.failed == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
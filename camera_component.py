@@ -1,8 +1,71 @@
-# camera_component.py (v2.14)
+# camera_component.py (v2.17)
+import threading
+import time
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, WebRtcMode
 from pyzbar.pyzbar import decode
 import av
+from datamatrix_decoder import DATAMATRIX_AVAILABLE, DataMatrixDecoder, paused_for
+
+def _get_dmtx_decoder(key):
+    """Returns this scanner's DataMatrix decoder, or None if pylibdmtx is not installed."""
+    if not DATAMATRIX_AVAILABLE: return None
+    decoder_key = f"dmtx_decoder_{key}"
+    if decoder_key not in st.session_state:
+        st.session_state[decoder_key] = DataMatrixDecoder()
+    return st.session_state[decoder_key]
+
+def _datamatrix_status():
+    """Tells the operator when DataMatrix labels will not scan."""
+    if not DATAMATRIX_AVAILABLE:
+        st.caption("DataMatrix scanning is unavailable on this server (libdmtx not installed). 1D and QR codes still scan.")
+    elif paused_for():
+        st.warning(f"DataMatrix scanning is paused after repeated decoder errors and resumes in {paused_for():.0f}s. 1D and QR codes still scan.")
+
+def _decode_frame(img, dmtx_decoder):
+    """
+    Runs the cheap pyzbar (1D/QR) pass first. Frames without a hit are handed
+    to the DataMatrix pool, whose result arrives on a later frame.
+    """
+    values = [obj.data.decode("utf-8") for obj in decode(img)]
+    if values or dmtx_decoder is None: return values
+    values = dmtx_decoder.poll()
+    dmtx_decoder.submit(img)
+    return values
+
+class MultiCapture:
+    """
+    Collects every distinct code decoded during a capture window.
+    Written from the webrtc frame thread and read from the script thread, so
+    all access goes through a lock. A code's count is the number of frames it
+    appeared in, which filters out one-off misreads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._deadline = 0.0
+
+    def start(self, window_seconds):
+        with self._lock:
+            self._counts = {}
+            self._deadline = time.monotonic() + window_seconds
+
+    def seconds_left(self):
+        return max(0.0, self._deadline - time.monotonic())
+
+    def add(self, values):
+        if time.monotonic() > self._deadline: return
+        with self._lock:
+            for value in set(values):
+                self._counts[value] = self._counts.get(value, 0) + 1
+
+    def seen(self):
+        """Returns (code, frame_count) pairs in the order the codes were first seen."""
+        with self._lock:
+            return list(self._counts.items())
+
+    def confirmed(self, min_seen):
+        return [code for code, count in self.seen() if count >= min_seen]
 
 def barcode_scanner_component(key: str):
     """
@@ -11,13 +74,14 @@ def barcode_scanner_component(key: str):
     """
     # We use a unique session state key to store the scanned value
     session_key = f"scanned_value_{key}"
+    dmtx_decoder = _get_dmtx_decoder(key)
 
     def video_frame_callback(frame: av.VideoFrame):
         img = frame.to_ndarray(format="bgr24")
-        decoded_objects = decode(img)
-        if decoded_objects:
+        values = _decode_frame(img, dmtx_decoder)
+        if values:
             # Set the value in session state
-            st.session_state[session_key] = decoded_objects[0].data.decode("utf-8")
+            st.session_state[session_key] = values[0]
         return frame
 
     webrtc_streamer(
@@ -27,6 +91,7 @@ def barcode_scanner_component(key: str):
         media_stream_constraints={"video": True, "audio": False},
         async_processing=True,
     )
+    _datamatrix_status()
 
     # Check if a value was found and return it
     if session_key in st.session_state and st.session_state[session_key]:
@@ -35,4 +100,54 @@ def barcode_scanner_component(key: str):
         del st.session_state[session_key]
         return result
         
-    return None
\ No newline at end of file
+    return None
+
+def multi_barcode_scanner_component(key: str, window_seconds: float = 5.0, min_seen: int = 3):
+    """
+    Scans every barcode visible to the camera during a short capture window.
+    Returns the list of distinct codes seen in at least `min_seen` frames once
+    the user adds them to the pending list, otherwise None.
+    """
+    capture_key = f"multi_capture_{key}"
+    if capture_key not in st.session_state:
+        st.session_state[capture_key] = MultiCapture()
+    capture = st.session_state[capture_key]
+    dmtx_decoder = _get_dmtx_decoder(key)
+
+    def video_frame_callback(frame: av.VideoFrame):
+        img = frame.to_ndarray(format="bgr24")
+        values = [v.strip() for v in _decode_frame(img, dmtx_decoder)]
+        if values: capture.add([v for v in values if v])
+        return frame
+
+    webrtc_streamer(
+        key=key,
+        mode=WebRtcMode.SENDRECV,
+        video_frame_callback=video_frame_callback,
+        media_stream_constraints={"video": True, "audio": False},
+        async_processing=True,
+    )
+    _datamatrix_status()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button(f"Start {window_seconds:g}s Capture", key=f"{key}_start", use_container_width=True):
+            capture.start(window_seconds)
+    with col2:
+        st.button("Refresh", key=f"{key}_refresh", use_container_width=True)
+
+    seconds_left = capture.seconds_left()
+    if seconds_left: st.caption(f"Capturing... {seconds_left:.0f}s left. Sweep the camera across every label.")
+    seen = capture.seen()
+    if not seen:
+        st.caption("No codes captured yet.")
+        return None
+    st.caption(f"Codes seen in fewer than {min_seen} frames are ignored.")
+    for code, count in seen:
+        status = "✅" if count >= min_seen else "…"
+        st.text(f"{status} {code} (seen {count}x)")
+    confirmed = capture.confirmed(min_seen)
+    if st.button(f"Add {len(confirmed)} to Pending", key=f"{key}_add", disabled=not confirmed or bool(seconds_left)):
+        capture.start(0)
+        return confirmed
+    return None
@@ -0,0 +1,44 @@
+# conftest.py
+"""Stubbed Asana transport shared by the AsanaClient tests."""
+import json
+import threading
+
+import pytest
+import requests
+
+import asana_api_client
+
+class StubTransport:
+    """
+    Stands in for requests.request. Records every (method, url) call and
+    delegates to `handler(method, url, params, json)`, which returns
+    (status, body) or raises a requests exception.
+    """
+    def __init__(self):
+        self.calls = []
+        self.handler = lambda method, url, params, json: (200, {"data": {}})
+        self._lock = threading.Lock()
+
+    def __call__(self, method, url, params=None, json=None, timeout=None, **kwargs):
+        with self._lock:
+            self.calls.append((method, url))
+        status, body = self.handler(method, url, params, json)
+        return self.response(status, body)
+
+    @staticmethod
+    def response(status, body):
+        response = requests.models.Response()
+        response.status_code = status
+        response.reason = "Stub"
+        response._content = json.dumps(body).encode()
+        return response
+
+    def count(self, method, suffix):
+        with self._lock:
+            return sum(1 for m, url in self.calls if m == method and url.endswith(suffix))
+
+@pytest.fixture
+def asana_transport(monkeypatch):
+    transport = StubTransport()
+    monkeypatch.setattr(asana_api_client.requests, "request", transport)
+    return transport
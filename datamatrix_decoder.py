@@ -0,0 +1,186 @@
+# datamatrix_decoder.py (v1.2)
+"""
+DataMatrix decoding via libdmtx, isolated in a process pool.
+
+libdmtx is CPU-heavy and can stall on noisy frames, so it never runs on the
+Streamlit or webrtc threads. Each scanner keeps at most one frame in flight:
+new frames are dropped while a decode is running, results for frames older
+than `max_frame_age` are discarded, and a worker that overruns its timeout
+is killed by recycling the pool. After `MAX_CONSECUTIVE_FAILURES` decoder
+errors in a row, decoding pauses for `FAILURE_BACKOFF` seconds and then
+resumes, so one bad frame cannot switch it off for a whole shift.
+
+Benchmark on sample label images (prints frames per second):
+    python datamatrix_decoder.py label1.png label2.jpg --runs 20
+"""
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+try:
+    # Importing the decode module loads the native libdmtx, so this fails if only the wheel is installed.
+    from pylibdmtx import pylibdmtx as _pylibdmtx
+    DATAMATRIX_AVAILABLE = True
+except ImportError as e:
+    logging.info(f"DataMatrix decoding disabled: {e}")
+    DATAMATRIX_AVAILABLE = False
+DECODER_WORKERS = 1
+MAX_CONSECUTIVE_FAILURES = 5
+FAILURE_BACKOFF = 300.0
+
+_pool = None
+_pool_lock = threading.Lock()
+_failures = 0
+_paused_until = 0.0
+
+def _record_failure(reason):
+    """Counts a decoder error; enough of them in a row pause decoding for FAILURE_BACKOFF seconds."""
+    global _failures, _paused_until
+    with _pool_lock:
+        _failures += 1
+        if _failures < MAX_CONSECUTIVE_FAILURES:
+            logging.warning(f"DataMatrix decoder error ({_failures}/{MAX_CONSECUTIVE_FAILURES}): {reason}")
+            return
+        _failures = 0
+        _paused_until = time.monotonic() + FAILURE_BACKOFF
+    logging.error(f"DataMatrix decoding paused for {FAILURE_BACKOFF:.0f}s after {MAX_CONSECUTIVE_FAILURES} consecutive decoder errors: {reason}")
+
+def _record_success():
+    global _failures
+    _failures = 0
+
+def paused_for():
+    """Returns the seconds until DataMatrix decoding resumes after repeated errors, or 0 if it is running."""
+    return max(0.0, _paused_until - time.monotonic())
+
+def _decode_in_worker(pixels, width, height, timeout_ms, max_count):
+    """Runs inside a pool process. Returns the decoded strings for one grayscale frame."""
+    from pylibdmtx.pylibdmtx import decode
+    results = decode((pixels, width, height), timeout=timeout_ms, max_count=max_count)
+    return [r.data.decode("utf-8", errors="replace") for r in results]
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            # Forking a process that already runs Streamlit/webrtc threads is unsafe.
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=DECODER_WORKERS, mp_context=context)
+        return _pool
+
+def _recycle_pool(pool):
+    """Discards a pool whose worker is stuck; the next submit starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not pool: return
+        _pool = None
+    logging.warning("DataMatrix decoder overran its timeout; restarting the decoder pool.")
+    # ProcessPoolExecutor cannot cancel a running task, so the stuck worker is terminated directly.
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def prepare_frame(img, max_width):
+    """Converts a BGR frame to downscaled grayscale bytes for libdmtx."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    if width > max_width:
+        height = int(height * max_width / width)
+        width = max_width
+        gray = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+    return gray.tobytes(), width, height
+
+class DataMatrixDecoder:
+    """Per-scanner handle on the shared decoder pool. `submit` and `poll` never block."""
+    def __init__(self, frame_timeout=0.3, max_frame_age=1.0, max_width=640, max_count=8):
+        self.frame_timeout = frame_timeout
+        self.max_frame_age = max_frame_age
+        self.max_width = max_width
+        self.max_count = max_count
+        self._lock = threading.Lock()
+        self._future = None
+        self._pool = None
+        self._submitted_at = 0.0
+
+    def submit(self, img):
+        """Queues a frame unless one is already being decoded. Returns True if queued."""
+        if paused_for(): return False
+        with self._lock:
+            # A frame still queued behind another scanner's is cancelled and replaced by this fresher one.
+            if self._future is not None and not self._future.done() and not self._future.cancel():
+                return False
+            pixels, width, height = prepare_frame(img, self.max_width)
+            self._pool = _get_pool()
+            try:
+                self._future = self._pool.submit(_decode_in_worker, pixels, width, height,
+                                                 int(self.frame_timeout * 1000), self.max_count)
+            except (BrokenProcessPool, RuntimeError):
+                _recycle_pool(self._pool)
+                self._future = None
+                return False
+            self._submitted_at = time.monotonic()
+            return True
+
+    def poll(self):
+        """Returns the codes from the last finished frame, or [] if none are ready or fresh."""
+        with self._lock:
+            future = self._future
+            if future is None: return []
+            age = time.monotonic() - self._submitted_at
+            if not future.done():
+                # libdmtx enforces frame_timeout itself; well past it, the worker is hung.
+                if age > self.frame_timeout * 4 + 1.0:
+                    self._future = None
+                    _recycle_pool(self._pool)
+                return []
+            self._future = None
+        if future.cancelled() or age > self.max_frame_age + self.frame_timeout: return []
+        try:
+            codes = future.result()
+        except BrokenProcessPool:
+            return [] # The pool was recycled under this frame; the next submit starts a fresh one.
+        except Exception as e:
+            _record_failure(e)
+            return []
+        _record_success()
+        return codes
+
+def _benchmark(paths, runs):
+    from pyzbar.pyzbar import decode as zbar_decode
+    decoder = DataMatrixDecoder(frame_timeout=1.0, max_frame_age=60.0)
+    decoder.submit(cv2.imread(paths[0]))
+    while not decoder.poll() and decoder._future is not None: time.sleep(0.01) # warm up the pool
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            print(f"{path}: could not read image")
+            continue
+        started = time.perf_counter()
+        for _ in range(runs): zbar_codes = [obj.data.decode("utf-8") for obj in zbar_decode(img)]
+        zbar_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(runs):
+            decoder.submit(img)
+            while decoder._future is not None and not decoder._future.done(): time.sleep(0.001)
+            dmtx_codes = decoder.poll()
+        dmtx_elapsed = time.perf_counter() - started
+        print(f"{path}: pyzbar {runs / zbar_elapsed:.1f} fps {zbar_codes} | "
+              f"libdmtx (pool) {runs / dmtx_elapsed:.1f} fps {dmtx_codes}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark barcode decoding frames per second on sample label images.")
+    parser.add_argument("images", nargs="+", help="Sample label images.")
+    parser.add_argument("--runs", type=int, default=20, help="Decodes per image (default: %(default)s).")
+    args = parser.parse_args()
+    if not DATAMATRIX_AVAILABLE:
+        print("pylibdmtx is not installed.", file=sys.stderr)
+        sys.exit(1)
+    _benchmark(args.images, args.runs)
@@ -1,4 +1,4 @@
-# parsers.py (v2.0)
+# parsers.py (v2.1)
 import re
 
 def parse_cal_cert_title(title: str) -> dict:
@@ -41,4 +41,26 @@ def parse_cal_cert_title(title: str) -> dict:
     if parsed_data['range'] != "NOT FOUND":
         parsed_data['range'] = f"{parsed_data['range']} Torr"
         
-    return parsed_data
\ No newline at end of file
+    return parsed_data
+
+RECIPE_ACTION_MAP = {"TAG": "add_tag", "REMOVE_TAG": "remove_tag", "ASSIGN": "assign_to", "MOVE": "move_to", "COMMENT": "add_comment"}
+RECIPE_TARGET_MAP = {"SUB": "subtask", "MAIN": "main"}
+
+def parse_recipe_formula(formula: str) -> list:
+    """
+    Parses a barcode formula of the form `TARGET:COMMAND:Value;` into a recipe.
+    TARGET is optional and defaults to the subtask.
+
+    Raises:
+        KeyError: If a command or target is not recognised.
+    """
+    recipe = []
+    for action in formula.split(';'):
+        parts = action.split(':', 2)
+        if len(parts) == 3:
+            target, command, value = parts
+            recipe.append({'type': RECIPE_ACTION_MAP[command.upper().strip()], 'target': RECIPE_TARGET_MAP[target.upper().strip()], 'value': value.strip()})
+        elif len(parts) == 2:
+            command, value = parts
+            recipe.append({'type': RECIPE_ACTION_MAP[command.upper().strip()], 'target': 'subtask', 'value': value.strip()})
+    return recipe
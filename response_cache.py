@@ -0,0 +1,74 @@
+# response_cache.py (v1.0)
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache for read results, shared by every session.
+    Each entry is indexed by the GIDs it mentions, so a write to a task or tag
+    drops every cached read that could have returned it.
+    """
+    def __init__(self, ttl=30, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (expires_at, value, gids)
+        self._index = {} # gid -> set of keys
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None: self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self):
+        """Changes on every invalidation. Pass it to `put` to discard reads that raced a write."""
+        return self._generation
+
+    def put(self, key, value, gids, generation):
+        with self._lock:
+            if generation != self._generation: return
+            if key in self._entries: self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, gids)
+            for gid in gids:
+                self._index.setdefault(gid, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *gids):
+        with self._lock:
+            self._generation += 1
+            for gid in gids:
+                for key in self._index.pop(gid, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def _remove(self, key):
+        _, _, gids = self._entries.pop(key)
+        for gid in gids:
+            keys = self._index.get(gid)
+            if keys is None: continue
+            keys.discard(key)
+            if not keys: del self._index[gid]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "invalidations": self.invalidations,
+            }
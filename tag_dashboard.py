@@ -0,0 +1,106 @@
+# tag_dashboard.py (v1.2)
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app_context import TAG_MAP, REASON_TAG_KEYS
+
+DEFAULT_REFRESH_INTERVAL = 300
+DASHBOARD_SESSION = "tag_dashboard"
+NO_PROJECT = "(no project)"
+
+class TagAggregate:
+    """Counts for one reason tag, broken down by project and by section."""
+    __slots__ = ("tag_name", "count", "by_project", "by_section", "refreshed_at", "error")
+
+    def __init__(self, tag_name, count=0, by_project=None, by_section=None, refreshed_at=0.0, error=None):
+        self.tag_name = tag_name
+        self.count = count
+        self.by_project = by_project or Counter()
+        self.by_section = by_section or Counter()
+        self.refreshed_at = refreshed_at
+        self.error = error
+
+class TagDashboard:
+    """
+    Cached per-tag aggregates for the reason tags, shared by every session.
+    A background thread refreshes each tag once it is older than
+    `refresh_interval`, fetching tags concurrently; readers always get the
+    last completed aggregates from `snapshot()` and never wait on Asana.
+    """
+    def __init__(self, context, refresh_interval=DEFAULT_REFRESH_INTERVAL, max_workers=4):
+        self.context = context
+        self.refresh_interval = refresh_interval
+        self.tags = {TAG_MAP[key]: context.gids[key] for key in REASON_TAG_KEYS if context.gids.get(key)}
+        self._project_names = {p['gid']: p['name'] for p in context.config.get('projects', [])}
+        self._aggregates = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tag-dashboard")
+        self._scheduler = None
+
+    def start(self):
+        """Starts the background refresh schedule if it is not running yet."""
+        with self._lock:
+            if self._scheduler is not None: return
+            self._scheduler = threading.Thread(target=self._run_schedule, name="tag-dashboard-scheduler", daemon=True)
+            self._scheduler.start()
+
+    def _run_schedule(self):
+        tick = min(30, self.refresh_interval)
+        while True:
+            self.refresh_stale()
+            time.sleep(tick)
+
+    def refresh_stale(self, force=False):
+        """Queues a refresh for every tag that is stale (or all tags if `force`). Does not block."""
+        now = time.monotonic()
+        with self._lock:
+            due = [name for name in self.tags if name not in self._refreshing and (
+                force or name not in self._aggregates
+                or now - self._aggregates[name].refreshed_at >= self.refresh_interval)]
+            self._refreshing.update(due)
+        for name in due:
+            self._executor.submit(self._refresh_tag, name)
+
+    def _refresh_tag(self, tag_name):
+        try:
+            self.context.client.bind_session(DASHBOARD_SESSION)
+            result = self.context.client.get_tasks_by_tag(self.tags[tag_name], fields=("parent_gid", "sections", "parent_sections"), paginate=True)
+            if result["success"]:
+                aggregate = self._aggregate(tag_name, result["tasks"])
+            else:
+                aggregate = self._failed(tag_name, result.get('message', 'Unknown error'))
+        except Exception as e:
+            logging.error(f"Dashboard refresh failed for tag '{tag_name}': {e}", exc_info=True)
+            aggregate = self._failed(tag_name, str(e))
+        with self._lock:
+            self._aggregates[tag_name] = aggregate
+            self._refreshing.discard(tag_name)
+
+    def _failed(self, tag_name, error):
+        """Keeps serving the previous counts, but surfaces the failure."""
+        with self._lock:
+            previous = self._aggregates.get(tag_name) or TagAggregate(tag_name)
+        return TagAggregate(tag_name, previous.count, previous.by_project, previous.by_section, time.monotonic(), error)
+
+    def _aggregate(self, tag_name, tasks):
+        by_project, by_section = Counter(), Counter()
+        for task in tasks:
+            # Reason tags sit on subtasks, which inherit their place in the board from the parent.
+            sections = task.parent_sections if task.parent_gid else task.sections
+            if not sections:
+                by_project[NO_PROJECT] += 1
+                continue
+            for project_name in {self._project_names.get(s.project_gid, s.project_gid) for s in sections}:
+                by_project[project_name] += 1
+            for section in sections:
+                by_section[f"{self._project_names.get(section.project_gid, section.project_gid)} / {section.name}"] += 1
+        return TagAggregate(tag_name, len(tasks), by_project, by_section, time.monotonic())
+
+    def snapshot(self):
+        """Returns ({tag name: TagAggregate}, set of tag names currently refreshing)."""
+        with self._lock:
+            return dict(self._aggregates), set(self._refreshing)
@@ -0,0 +1,82 @@
+# test_asana_client_concurrency.py
+"""Many threads from several browser sessions sharing one AsanaClient, against a stubbed transport."""
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from asana_api_client import AsanaClient
+
+SESSIONS = ("station-1", "station-2", "station-3", "station-4")
+
+class SlowAsana:
+    """Stub transport handler; tracks concurrent calls overall and per session (sent as a query param)."""
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = Counter()
+        self.peak = Counter()
+        self.peak_total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, method, url, params, json):
+        session = (params or {}).get("session")
+        with self._lock:
+            self.active[session] += 1
+            self.peak[session] = max(self.peak[session], self.active[session])
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+        try:
+            time.sleep(self.delay)
+            return 200, {"data": {"gid": "1000001"}}
+        finally:
+            with self._lock:
+                self.active[session] -= 1
+
+@pytest.fixture
+def slow_asana(asana_transport):
+    asana_transport.handler = SlowAsana(delay=0.05)
+    return asana_transport.handler
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+
+def test_identical_gets_from_all_sessions_collapse_to_one_call(asana_transport, slow_asana):
+    slow_asana.delay = 0.3
+    client = AsanaClient("token", "workspace")
+    threads_per_session = 6
+    barrier = threading.Barrier(len(SESSIONS) * threads_per_session)
+    results = []
+
+    def worker(session_id):
+        client.bind_session(session_id)
+        barrier.wait()
+        results.append(client._make_request('GET', "/tasks/1000001"))
+
+    run_threads([lambda s=s: worker(s) for s in SESSIONS for _ in range(threads_per_session)])
+    assert asana_transport.count('GET', "/tasks/1000001") == 1
+    assert len(results) == len(SESSIONS) * threads_per_session
+    assert all(result["success"] for result in results)
+
+def test_no_session_exceeds_its_slot_limit(asana_transport, slow_asana):
+    client = AsanaClient("token", "workspace", max_concurrent=6, per_session_limit=2)
+    client.hedge_budget.ratio = 0 # A hedge is a second transport call under the same slot.
+    threads_per_session, requests_per_thread = 6, 5
+    barrier = threading.Barrier(len(SESSIONS) * threads_per_session)
+    failures = []
+
+    def worker(session_id, thread_no):
+        client.bind_session(session_id)
+        barrier.wait()
+        for i in range(requests_per_thread):
+            result = client._make_request('GET', f"/tasks/{thread_no}-{i}", params={"session": session_id})
+            if not result["success"]: failures.append(result)
+
+    run_threads([lambda s=s, n=n: worker(s, n) for s in SESSIONS for n in range(threads_per_session)])
+    assert not failures
+    assert len(asana_transport.calls) == len(SESSIONS) * threads_per_session * requests_per_thread
+    assert all(slow_asana.peak[s] <= client.per_session_limit for s in SESSIONS)
+    assert max(slow_asana.peak[s] for s in SESSIONS) == client.per_session_limit
+    assert slow_asana.peak_total <= 6
@@ -0,0 +1,170 @@
+# test_asana_resilience.py
+"""Adaptive timeouts, hedged GETs, circuit breaker and write replay against a stubbed Asana transport."""
+import time
+
+import pytest
+import requests
+
+from asana_api_client import AsanaClient
+from asana_resilience import CLOSED, OPEN
+
+TASK_GID = "1000001"
+TAG_GID = "2000002"
+
+class MockAsana:
+    """Stub transport handler for one task; `behaviour(method, url)` returns a delay, a status code or an exception."""
+    def __init__(self, transport):
+        self.transport = transport
+        self.tags = []
+        self.behaviour = lambda method, url: None
+
+    def __call__(self, method, url, params, json):
+        outcome = self.behaviour(method, url)
+        if isinstance(outcome, Exception): raise outcome
+        if isinstance(outcome, float):
+            time.sleep(outcome)
+            outcome = None
+        if method == 'POST' and url.endswith("/addTag"):
+            self.tags.append(json["data"]["tag"])
+        if method == 'POST' and url.endswith("/removeTag") and json["data"]["tag"] in self.tags:
+            self.tags.remove(json["data"]["tag"])
+        return outcome or 200, {"data": {"gid": TASK_GID, "name": "WIP-1", "tags": [{"gid": g} for g in self.tags]}}
+
+    @property
+    def calls(self):
+        return self.transport.calls
+
+    def count(self, method, suffix):
+        return self.transport.count(method, suffix)
+
+@pytest.fixture
+def mock_asana(asana_transport):
+    asana_transport.handler = MockAsana(asana_transport)
+    return asana_transport.handler
+
+@pytest.fixture
+def client():
+    client = AsanaClient("token", "workspace", cache_ttl=0)
+    client.retry_queue.poll_interval = 0.05
+    return client
+
+def warm_up(client, samples=25):
+    for _ in range(samples):
+        assert client._make_request('GET', f"/tasks/{TASK_GID}")["success"]
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition(): return True
+        time.sleep(0.01)
+    return False
+
+def test_timeout_shrinks_with_fast_responses_and_widens_after_timeouts(client, mock_asana):
+    key = "GET /tasks/{gid}"
+    assert client.latency.timeout_for(key) == client.latency.default_timeout
+    warm_up(client)
+    assert client.latency.timeout_for(key) == client.latency.min_timeout
+
+    mock_asana.behaviour = lambda method, url: requests.exceptions.Timeout("slow")
+    assert not client._make_request('GET', f"/tasks/{TASK_GID}")["success"]
+    assert client.latency.timeout_for(key) > client.latency.min_timeout
+
+def test_slow_get_is_hedged_and_first_success_wins(client, mock_asana):
+    warm_up(client)
+    first_call = len(mock_asana.calls)
+    mock_asana.behaviour = lambda method, url: 2.0 if len(mock_asana.calls) == first_call + 1 else None
+
+    started = time.monotonic()
+    result = client._make_request('GET', f"/tasks/{TASK_GID}")
+    assert result["success"]
+    assert time.monotonic() - started < 1.0
+    assert len(mock_asana.calls) == first_call + 2
+
+def test_hedges_stay_within_budget_during_broad_slowdown(client, mock_asana):
+    warm_up(client)
+    first_call = len(mock_asana.calls)
+    mock_asana.behaviour = lambda method, url: 0.4
+    for _ in range(10):
+        assert client._make_request('GET', f"/tasks/{TASK_GID}")["success"]
+    hedges = len(mock_asana.calls) - first_call - 10
+    assert hedges <= 2
+
+def test_breaker_opens_fails_fast_then_half_opens_and_closes(client, mock_asana):
+    client.breaker.reset_timeout = 0.2
+    mock_asana.behaviour = lambda method, url: 503
+    for _ in range(client.breaker.failure_threshold):
+        client._make_request('GET', f"/tasks/{TASK_GID}")
+    assert client.breaker.state == OPEN
+
+    calls = len(mock_asana.calls)
+    result = client._make_request('GET', f"/tasks/{TASK_GID}")
+    assert not result["success"] and "unavailable" in result["message"]
+    assert len(mock_asana.calls) == calls
+
+    mock_asana.behaviour = lambda method, url: None
+    time.sleep(0.25)
+    assert client._make_request('GET', f"/tasks/{TASK_GID}")["success"]
+    assert client.breaker.state == CLOSED
+
+def test_failed_half_open_probe_reopens_breaker(client, mock_asana):
+    client.breaker.reset_timeout = 0.1
+    mock_asana.behaviour = lambda method, url: requests.exceptions.ConnectionError("down")
+    for _ in range(client.breaker.failure_threshold):
+        client._make_request('GET', f"/tasks/{TASK_GID}")
+    time.sleep(0.15)
+    client._make_request('GET', f"/tasks/{TASK_GID}")
+    assert client.breaker.state == OPEN
+
+def test_queued_write_is_replayed_and_invalidates_cache(mock_asana):
+    client = AsanaClient("token", "workspace", cache_ttl=60)
+    client.retry_queue.poll_interval = 0.05
+    client.breaker.reset_timeout = 0.1
+    before = client.get_task_details(TASK_GID, fields=("tags",))
+    assert before["success"] and TAG_GID not in before["task"].tag_gids
+
+    mock_asana.behaviour = lambda method, url: requests.exceptions.ConnectionError("down")
+    for _ in range(client.breaker.failure_threshold):
+        client._make_request('GET', "/workspaces/workspace/tags")
+    assert client.breaker.state == OPEN
+
+    result = client.add_tag_to_task(TASK_GID, TAG_GID)
+    assert not result["success"] and result["queued"]
+    assert mock_asana.count('POST', "/addTag") == 0
+
+    mock_asana.behaviour = lambda method, url: None
+    assert wait_for(lambda: len(client.retry_queue) == 0)
+    assert mock_asana.count('POST', "/addTag") == 1
+    assert client.breaker.state == CLOSED
+    after = client.get_task_details(TASK_GID, fields=("tags",))
+    assert TAG_GID in after["task"].tag_gids
+
+def test_writes_after_recovery_wait_behind_queued_writes(mock_asana):
+    client = AsanaClient("token", "workspace", cache_ttl=0)
+    client.retry_queue.poll_interval = 0.5
+    client.breaker.reset_timeout = 0.1
+    mock_asana.behaviour = lambda method, url: requests.exceptions.ConnectionError("down")
+    for _ in range(client.breaker.failure_threshold):
+        client._make_request('GET', f"/tasks/{TASK_GID}")
+    assert client.add_tag_to_task(TASK_GID, TAG_GID)["queued"]
+
+    # A read closes the breaker while the queued write still waits for the next drain poll.
+    mock_asana.behaviour = lambda method, url: None
+    time.sleep(0.15)
+    assert client._make_request('GET', f"/tasks/{TASK_GID}")["success"]
+    assert client.breaker.state == CLOSED
+    result = client.remove_tag_from_task(TASK_GID, TAG_GID)
+    assert result["queued"]
+
+    assert wait_for(lambda: len(client.retry_queue) == 0)
+    writes = [url.rsplit("/", 1)[1] for method, url in mock_asana.calls if method == 'POST']
+    assert writes == ["addTag", "removeTag"]
+    assert TAG_GID not in mock_asana.tags
+
+def test_writes_fail_instead_of_queueing_when_disabled(mock_asana):
+    client = AsanaClient("token", "workspace", queue_writes=False)
+    mock_asana.behaviour = lambda method, url: requests.exceptions.ConnectionError("down")
+    for _ in range(client.breaker.failure_threshold):
+        client._make_request('GET', f"/tasks/{TASK_GID}")
+    result = client.add_tag_to_task(TASK_GID, TAG_GID)
+    assert not result["success"] and not result.get("queued")
+    assert len(client.retry_queue) == 0
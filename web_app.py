@@ -1,14 +1,20 @@
-# web_app.py (v2.31 - Final)
+# web_app.py (v2.39)
 import streamlit as st
 import json
 import os
 import extra_streamlit_components as stx
 import time
+import uuid
+import math
 
 from asana_api_client import AsanaClient
 from app_context import AppContext
+from asana_records import Task
+from tag_dashboard import TagDashboard, DEFAULT_REFRESH_INTERVAL
+from activity_log import ActivityLog, build_entry, DEFAULT_MAX_ENTRIES
 from ui_components import cor_dog_reason_selector
-from camera_component import barcode_scanner_component
+from parsers import parse_recipe_formula
+from camera_component import barcode_scanner_component, multi_barcode_scanner_component
 from web_operations import (
     process_heater_board_swap,
     process_device_cleaned,
@@ -17,6 +23,7 @@ from web_operations import (
     process_cor_operation,
     process_custom_operation,
     process_move_cart,
+    process_wip_batch,
     _find_and_validate_tasks
 )
 
@@ -27,6 +34,7 @@ except (FileNotFoundError, KeyError):
     st.error("Secrets file not found or ASANA_TOKEN is missing. Please create a .streamlit/secrets.toml file.")
     st.stop()
 CONFIG_FILE = "config.json"
+LOG_PAGE_SIZE = 10
 
 st.set_page_config(layout="wide")
 
@@ -35,10 +43,11 @@ if 'wip_input' not in st.session_state: st.session_state.wip_input = ""
 if 'custom_wip_input' not in st.session_state: st.session_state.custom_wip_input = ""
 if 'cart_tag_input' not in st.session_state: st.session_state.cart_tag_input = ""
 if 'barcode_formula_input' not in st.session_state: st.session_state.barcode_formula_input = ""
-if 'log' not in st.session_state: st.session_state.log = []
+if 'log_page' not in st.session_state: st.session_state.log_page = 0
 if 'last_op_result' not in st.session_state: st.session_state.last_op_result = None
 if 'custom_recipe' not in st.session_state: st.session_state.custom_recipe = []
 if 'device_name' not in st.session_state: st.session_state.device_name = None
+if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex
 
 # --- Helper Functions (unchanged) ---
 @st.cache_resource
@@ -51,11 +60,53 @@ def initialize_app():
     if errors: return None, f"Critical Error: Could not find required GIDs: {', '.join(errors)}"
     return context, None
 
-def log_result(result):
-    st.session_state.log.insert(0, result['message'])
-    st.session_state.last_op_result = result
+@st.cache_resource
+def get_tag_dashboard(_context):
+    refresh_interval = _context.config.get('dashboard', {}).get('refresh_interval_s', DEFAULT_REFRESH_INTERVAL)
+    dashboard = TagDashboard(_context, refresh_interval=refresh_interval)
+    dashboard.start()
+    return dashboard
+
+def build_dashboard_ui(context):
+    dashboard = get_tag_dashboard(context)
+    aggregates, refreshing = dashboard.snapshot()
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.caption(f"Counts refresh in the background every {dashboard.refresh_interval // 60} min. Reload the page to see new data.")
+        if refreshing: st.caption(f"Refreshing: {', '.join(sorted(refreshing))}")
+    with col2:
+        if st.button("Refresh Now", use_container_width=True):
+            dashboard.refresh_stale(force=True)
+            st.rerun()
+    if not aggregates:
+        st.info("Loading tag counts from Asana...")
+        return
+    now = time.monotonic()
+    rows = []
+    for tag_name in dashboard.tags:
+        aggregate = aggregates.get(tag_name)
+        if not aggregate: continue
+        rows.append({"Tag": tag_name, "Tasks": aggregate.count,
+                     "Updated": f"{(now - aggregate.refreshed_at) / 60:.0f} min ago",
+                     "Status": f"FAILED: {aggregate.error}" if aggregate.error else "OK"})
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    selected_tag = st.selectbox("Breakdown for tag:", [row["Tag"] for row in rows])
+    aggregate = aggregates[selected_tag]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("By Project")
+        st.dataframe([{"Project": k, "Tasks": v} for k, v in aggregate.by_project.most_common()], use_container_width=True, hide_index=True)
+    with col2:
+        st.subheader("By Section")
+        st.dataframe([{"Section": k, "Tasks": v} for k, v in aggregate.by_section.most_common()], use_container_width=True, hide_index=True)
 
-def run_operation(operation_func, context, *args):
+def log_result(context, operation, wip, result, duration):
+    entry = build_entry(operation, wip, st.session_state.device_name, result, duration)
+    st.session_state.log.append(entry)
+    context.journal.write(entry)
+
+def run_operation(operation_func, context, *args, label, wip, on_complete=None):
+    """Runs one operation and journals it under `label` for `wip`."""
     device_name = st.session_state.device_name
     if not device_name:
         st.warning("Device name not set. Please refresh and set a device name.")
@@ -65,12 +116,70 @@ def run_operation(operation_func, context, *args):
         return
     full_args = args + (device_name,)
     with st.spinner("Processing..."):
+        started = time.monotonic()
         result = operation_func(context, *full_args)
-        log_result(result)
+        log_result(context, label, wip, result, time.monotonic() - started)
+        st.session_state.last_op_result = result
         if result.get("fallback_needed"): st.session_state.manual_wip_needed = True
         else: st.session_state.manual_wip_needed = False
+        if on_complete: on_complete()
     st.rerun()
 
+def run_batch_operation(operation_func, context, wip_numbers, *args, label, on_complete=None):
+    """Runs `operation_func` for a tray of WIPs and logs one entry per WIP under `label`, with its own steps."""
+    device_name = st.session_state.device_name
+    if not device_name:
+        st.warning("Device name not set. Please refresh and set a device name.")
+        return
+    with st.spinner(f"Processing {len(wip_numbers)} WIPs..."):
+        result = process_wip_batch(context, wip_numbers, operation_func, *args, device_name)
+        for wip, wip_result, duration in result["results"]:
+            log_result(context, label, wip, wip_result, duration)
+        st.session_state.last_op_result = result
+        if on_complete: on_complete()
+    st.rerun()
+
+def resolve_recipe(barcode_input):
+    if not barcode_input: return st.session_state.custom_recipe
+    try: return parse_recipe_formula(barcode_input)
+    except Exception as e: st.error(f"Invalid barcode formula syntax: {e}"); return []
+
+def build_multi_capture_ui(context, key, mode, operation_func, label, extra_args=lambda: ()):
+    """Captures a tray of labels in one sweep and runs `operation_func` for each pending WIP."""
+    # Each mode keeps its own capture and pending list so a tray never runs under another operation.
+    key = f"{key}_{mode.replace(' ', '_').lower()}"
+    pending_key = f"pending_wips_{key}"
+    if pending_key not in st.session_state: st.session_state[pending_key] = []
+    pending = st.session_state[pending_key]
+    with st.expander("📷 Multi-Capture (whole tray)"):
+        codes = multi_barcode_scanner_component(key=key)
+        if codes:
+            pending.extend(c for c in codes if c not in pending)
+            st.rerun()
+        if not pending:
+            st.info("No pending WIPs. Start a capture and sweep the camera across the tray.")
+            return
+        st.markdown(f"**Pending WIPs ({len(pending)})**")
+        for i, wip in enumerate(pending):
+            col1, col2 = st.columns([5, 1])
+            with col1: st.text(wip)
+            with col2:
+                if st.button("✕", key=f"{key}_remove_{i}"):
+                    pending.pop(i)
+                    st.rerun()
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button(f"Run on {len(pending)} Devices", key=f"{key}_run", type="primary", use_container_width=True):
+                args = extra_args()
+                if args is not None:
+                    # Only drop the tray once it has actually run; run_batch_operation can bail out early.
+                    run_batch_operation(operation_func, context, list(pending), *args, label=label,
+                                        on_complete=lambda: st.session_state.pop(pending_key, None))
+        with col2:
+            if st.button("Clear Pending", key=f"{key}_clear", use_container_width=True):
+                st.session_state[pending_key] = []
+                st.rerun()
+
 def build_recipe_ui(context):
     st.subheader("Barcode Formula")
     st.info("Construct or scan a barcode: `TARGET:COMMAND:Value;` (e.g., `SUB:TAG:New Tag`)")
@@ -148,21 +257,41 @@ else:
     context, error = initialize_app()
     if error: st.error(error)
     else:
+        context.client.bind_session(st.session_state.session_id)
+        if 'log' not in st.session_state:
+            max_entries = context.config.get('activity_log', {}).get('max_entries', DEFAULT_MAX_ENTRIES)
+            st.session_state.log = ActivityLog(max_entries)
         st.sidebar.markdown(f"**Device:** `{st.session_state.device_name}`")
+        cache_stats = context.client.cache_stats()
+        st.sidebar.caption(f"Asana cache: {cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} entries")
+        if context.client.breaker.state != "closed":
+            st.sidebar.warning(f"Asana is not responding. Requests are paused; {len(context.client.retry_queue)} updates queued for retry.")
+        elif len(context.client.retry_queue):
+            st.sidebar.info(f"Asana is back. Sending {len(context.client.retry_queue)} queued updates.")
         if st.sidebar.button("Change Device Name"):
             cookie_manager.delete('device_name', key="delete_cookie")
             st.rerun()
         if st.session_state.last_op_result:
-            if st.session_state.last_op_result.get('success'): st.success(st.session_state.last_op_result['message'])
+            if st.session_state.last_op_result.get('queued'): st.warning(st.session_state.last_op_result['message'])
+            elif st.session_state.last_op_result.get('success'): st.success(st.session_state.last_op_result['message'])
             elif not st.session_state.get('manual_wip_needed'): st.error(st.session_state.last_op_result['message'])
             st.session_state.last_op_result = None
         st.sidebar.title("Operations")
-        mode = st.sidebar.radio("Choose an operation:", ("Heater Board Swapped", "Device Cleaned", "Device Complete", "Dog Operation", "COR Operation", "Custom Operation", "Move Cart"))
+        mode = st.sidebar.radio("Choose an operation:", ("Heater Board Swapped", "Device Cleaned", "Device Complete", "Dog Operation", "COR Operation", "Custom Operation", "Move Cart", "Reason Dashboard"))
         st.header(mode)
         
-        if mode in ("Custom Operation", "Move Cart"):
+        if mode == "Reason Dashboard":
+            build_dashboard_ui(context)
+        elif mode in ("Custom Operation", "Move Cart"):
             barcode_input = build_recipe_ui(context)
             st.markdown("---")
+            if mode == "Custom Operation":
+                def custom_recipe_args():
+                    recipe = resolve_recipe(barcode_input)
+                    if recipe: return (recipe,)
+                    st.warning("Cannot run an empty recipe.")
+                    return None
+                build_multi_capture_ui(context, "custom_multi_scanner", mode, process_custom_operation, "custom_operation", custom_recipe_args)
             form_key = f"{mode.replace(' ', '_').lower()}_form"
             with st.form(key=form_key, clear_on_submit=True):
                 if mode == "Custom Operation":
@@ -187,33 +316,29 @@ else:
                                 st.rerun()
                 submitted = st.form_submit_button(f"Run {mode}")
                 if submitted:
-                    recipe = []
-                    if barcode_input:
-                        try:
-                            actions = barcode_input.split(';'); action_map = {"TAG": "add_tag", "REMOVE_TAG": "remove_tag", "ASSIGN": "assign_to", "MOVE": "move_to", "COMMENT": "add_comment"}; target_map = {"SUB": "subtask", "MAIN": "main"}
-                            for action in actions:
-                                parts = action.split(':', 2)
-                                if len(parts) == 3: target, command, value = parts; recipe.append({'type': action_map[command.upper().strip()], 'target': target_map[target.upper().strip()], 'value': value.strip()})
-                                elif len(parts) == 2: command, value = parts; recipe.append({'type': action_map[command.upper().strip()], 'target': 'subtask', 'value': value.strip()})
-                        except Exception as e: st.error(f"Invalid barcode formula syntax: {e}"); recipe = []
-                    else: recipe = st.session_state.custom_recipe
+                    recipe = resolve_recipe(barcode_input)
                     if not recipe: st.warning("Cannot run an empty recipe.")
-                    elif mode == "Custom Operation": run_operation(process_custom_operation, context, st.session_state.custom_wip_input, recipe)
+                    elif mode == "Custom Operation":
+                        run_operation(process_custom_operation, context, st.session_state.custom_wip_input, recipe,
+                                      label="custom_operation", wip=st.session_state.custom_wip_input)
                     elif mode == "Move Cart":
-                        if st.session_state.cart_tag_input: run_operation(process_move_cart, context, st.session_state.cart_tag_input, recipe)
+                        cart_tag_name = st.session_state.cart_tag_input
+                        # The per-WIP outcomes are the entry's steps; the cart itself is not a WIP.
+                        if cart_tag_name: run_operation(process_move_cart, context, cart_tag_name, recipe, label=f"move_cart ({cart_tag_name})", wip="")
                         else: st.warning("Please provide a Cart Tag Name.")
         elif mode == "Device Complete":
             with st.form(key="device_complete_form", clear_on_submit=True):
                 uploaded_file = st.file_uploader("Upload Certificate", type=['xlsx'])
                 if st.session_state.get('manual_wip_needed'):
-                    st.warning(st.session_state.log[0])
+                    st.warning(st.session_state.log.latest()['message'])
                     manual_wip = st.text_input("Please enter WIP number manually:")
                 else: manual_wip = None
                 submitted = st.form_submit_button("Run Operation")
                 if submitted:
                     if uploaded_file:
                         file_data = {"file_name": uploaded_file.name, "file_content": uploaded_file.getvalue(), "content_type": uploaded_file.type}
-                        run_operation(process_device_complete, context, file_data, manual_wip)
+                        run_operation(process_device_complete, context, file_data, manual_wip, label="device_complete",
+                                      wip=manual_wip or os.path.splitext(uploaded_file.name)[0])
                     else: st.warning("Please upload a certificate file.")
         else: # Standard Operations
             if mode in ("Dog Operation", "COR Operation"):
@@ -243,9 +368,8 @@ else:
                         if task_validation["success"]:
                             if mode == "Dog Operation":
                                 parent_gid = task_validation["parent_gid"]
-                                parent_data_result = context.client.get_task_details(parent_gid, opt_fields="projects.gid")
-                                parent_data = parent_data_result.get("data",{}).get("data",{})
-                                if not any(p.get('gid') == context.gids.get("PROJECT_AMAT_AGS") for p in parent_data.get('projects', [])):
+                                parent = context.client.get_task_details(parent_gid, fields=("project_gids",)).get("task") or Task()
+                                if not parent.in_project(context.gids.get("PROJECT_AMAT_AGS")):
                                     st.subheader("Order Hold Workflow")
                                     is_order_hold = st.checkbox("Is this an ORDER HOLD?")
                                     order_hold_reason = st.text_input("Why is it an ORDER HOLD?")
@@ -261,10 +385,14 @@ else:
                     if submitted:
                         st.session_state.validated_wip = None 
                         if mode == "Dog Operation":
-                            run_operation(process_dog_operation, context, st.session_state.wip_input, reason_data, order_hold_reason)
+                            run_operation(process_dog_operation, context, st.session_state.wip_input, reason_data, order_hold_reason,
+                                          label="dog_operation", wip=st.session_state.wip_input)
                         elif mode == "COR Operation":
-                            run_operation(process_cor_operation, context, st.session_state.wip_input, reason_data)
+                            run_operation(process_cor_operation, context, st.session_state.wip_input, reason_data,
+                                          label="cor_operation", wip=st.session_state.wip_input)
             else: # Heater Board & Cleaned
+                standard_op, standard_label = (process_heater_board_swap, "heater_board_swap") if mode == "Heater Board Swapped" else (process_device_cleaned, "device_cleaned")
+                build_multi_capture_ui(context, "std_multi_scanner", mode, standard_op, standard_label)
                 with st.form(key=f"{mode}_form", clear_on_submit=True):
                     col1, col2 = st.columns([5, 1])
                     with col1:
@@ -277,14 +405,37 @@ else:
                                 st.rerun()
                     submitted = st.form_submit_button("Run Operation")
                     if submitted:
-                        if mode == "Heater Board Swapped": run_operation(process_heater_board_swap, context, st.session_state.wip_input)
-                        elif mode == "Device Cleaned": run_operation(process_device_cleaned, context, st.session_state.wip_input)
+                        run_operation(standard_op, context, st.session_state.wip_input, label=standard_label, wip=st.session_state.wip_input)
 
         st.markdown("---")
         st.subheader("Activity Log")
-        if st.button("Clear Log"):
-            st.session_state.log = []
-            st.session_state.last_op_result = None
-            st.rerun()
-        for entry in st.session_state.log:
-            st.info(entry)
\ No newline at end of file
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            log_filter = st.text_input("Filter log:", key="log_filter", placeholder="Filter by WIP, operation or text", label_visibility="collapsed")
+        with col2:
+            if st.button("Clear Log", use_container_width=True):
+                st.session_state.log.clear()
+                st.session_state.log_page = 0
+                st.session_state.last_op_result = None
+                st.rerun()
+        _, total = st.session_state.log.page(0, 0, log_filter)
+        num_pages = max(1, math.ceil(total / LOG_PAGE_SIZE))
+        st.session_state.log_page = min(st.session_state.log_page, num_pages - 1)
+        entries, _ = st.session_state.log.page(st.session_state.log_page, LOG_PAGE_SIZE, log_filter)
+        for entry in entries:
+            header = f"{entry['timestamp']} · {entry['operation']} · {entry['wip']} ({entry['duration_s']}s)"
+            if entry.get('queued'): st.warning(f"{header}\n\n{entry['message']}")
+            elif entry['success']: st.info(f"{header}\n\n{entry['message']}")
+            else: st.error(f"{header}\n\n{entry['message']}")
+        if num_pages > 1:
+            col1, col2, col3 = st.columns([1, 4, 1])
+            with col1:
+                if st.button("◀ Newer", disabled=st.session_state.log_page == 0, use_container_width=True):
+                    st.session_state.log_page -= 1
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {st.session_state.log_page + 1} of {num_pages} ({total} entries)")
+            with col3:
+                if st.button("Older ▶", disabled=st.session_state.log_page >= num_pages - 1, use_container_width=True):
+                    st.session_state.log_page += 1
+                    st.rerun()
\ No newline at end of file
@@ -1,39 +1,89 @@
-# web_operations.py (v2.24)
+# web_operations.py (v2.30)
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from asana_records import Task
+
+DEFAULT_BATCH_WORKERS = 3
+
+class _OperationSteps:
+    """
+    Records each API step of an operation. Steps run sequentially, so the time
+    since the previous step (or since creation) is that step's duration.
+    A write parked in the client's retry queue is recorded as queued, not
+    failed: it will still reach Asana, so the operation carries on.
+    """
+    def __init__(self, include_errors=False):
+        self.include_errors = include_errors
+        self.success = True
+        self.queued = False
+        self.messages = []
+        self.steps = []
+        self._last = time.monotonic()
+
+    def __call__(self, msg, res):
+        now = time.monotonic()
+        queued = bool(res.get("queued"))
+        if queued: self.queued = True
+        elif not res["success"]: self.success = False
+        if res["success"]: status = 'Success'
+        elif queued: status = 'Queued (will retry automatically)'
+        elif self.include_errors: status = f"FAILED: {res.get('message', 'Unknown')}"
+        else: status = 'FAILED'
+        self.messages.append(f"• {msg}: {status}")
+        self.steps.append({"step": msg, "success": res["success"], "queued": queued, "duration_s": round(now - self._last, 3)})
+        self._last = now
+
+QUEUED_NOTE = " Some updates are queued and will be sent when Asana recovers; do not re-run."
+
+STANDARD_REASONS = [
+    "Bad Sensor", "Pressure Oscillation", "INTERNAL LEAK",
+    "CONTAMINATED", "Positive Read Error", "Range Error",
+    "Negative ReadError", "Physically Damaged", "DRIFTING", "OTHER"
+]
+
+def build_reason_data(selected_reason, details_text=""):
+    """Builds the reason comment and tag used by the Dog and COR operations."""
+    if selected_reason == "OTHER":
+        # For OTHER, the comment is whatever the user typed, or just "OTHER"
+        final_comment = f"AUTO: {details_text}" if details_text else "AUTO: OTHER"
+        tag_name_to_add = None # No specific tag for OTHER
+    else:
+        # For standard reasons, combine the reason and any optional details
+        if details_text:
+            final_comment = f"AUTO: {selected_reason} - {details_text}"
+        else:
+            final_comment = f"AUTO: {selected_reason}"
+        tag_name_to_add = selected_reason
+    return {"comment": final_comment, "tag_name_to_add": tag_name_to_add}
 
 def _find_and_validate_tasks(context, wip_number):
-    # This function is correct and unchanged
-    opt_fields = "name,gid,parent,projects.gid,tags.gid"
     wip_lower = wip_number.lower()
-    initial_task_result = context.client.find_task_by_wip(wip_number, opt_fields=opt_fields)
+    initial_task_result = context.client.find_task_by_wip(wip_number)
     if not initial_task_result["success"]: return initial_task_result
-    task_data = initial_task_result["task_data"]
+    task = initial_task_result["task"]
     parent_gid = None; subtask_gid = None
-    parent_info = task_data.get('parent')
-    if parent_info:
-        parent_gid = parent_info.get('gid')
-        if wip_lower in task_data.get('name', '').lower():
-            subtask_gid = task_data.get('gid')
+    if task.parent_gid:
+        parent_gid = task.parent_gid
+        if wip_lower in task.name.lower():
+            subtask_gid = task.gid
         else:
             subtasks_result = context.client.get_subtasks_for_task(parent_gid)
             if not subtasks_result["success"]: return subtasks_result
-            subtasks = subtasks_result.get("data", {}).get("data", [])
-            matching_subtask = next((st for st in subtasks if wip_lower in st.get('name', '').lower()), None)
-            if matching_subtask: subtask_gid = matching_subtask['gid']
+            matching_subtask = next((st for st in subtasks_result["tasks"] if wip_lower in st.name.lower()), None)
+            if matching_subtask: subtask_gid = matching_subtask.gid
             else: return {"success": False, "message": f"Found a related task, but no subtask with '{wip_number}' in its name."}
     else:
-        parent_gid = task_data.get('gid')
+        parent_gid = task.gid
         subtasks_result = context.client.get_subtasks_for_task(parent_gid)
         if not subtasks_result["success"]: return subtasks_result
-        subtasks = subtasks_result.get("data", {}).get("data", [])
-        matching_subtask = next((st for st in subtasks if wip_lower in st.get('name', '').lower()), None)
+        matching_subtask = next((st for st in subtasks_result["tasks"] if wip_lower in st.name.lower()), None)
         if not matching_subtask: return {"success": False, "message": f"No subtask for '{wip_number}' found under the main task."}
-        subtask_gid = matching_subtask['gid']
-    parent_details = context.client.get_task_details(parent_gid, opt_fields="name,tags.gid,projects.gid")
-    parent_data = parent_details.get("data", {}).get("data", {}); parent_tags = {tag['gid'] for tag in parent_data.get("tags", [])}
-    if context.gids.get("PURGE_TAG") in parent_tags:
-        return {"success": False, "message": f"ERROR: Parent task '{parent_data.get('name')}' has the PURGE tag."}
+        subtask_gid = matching_subtask.gid
+    parent = context.client.get_task_details(parent_gid, fields=("name", "tags")).get("task") or Task()
+    if context.gids.get("PURGE_TAG") in parent.tag_gids:
+        return {"success": False, "message": f"ERROR: Parent task '{parent.name}' has the PURGE tag."}
     return {"success": True, "parent_gid": parent_gid, "subtask_gid": subtask_gid}
 
 def _resolve_name_or_gid(value, raw_config):
@@ -50,30 +100,34 @@ def _resolve_name_or_gid(value, raw_config):
     return None, f"Could not find GID for name '{value}'."
 
 def process_heater_board_swap(context, wip_number, device_name):
-    # This function is correct and unchanged
     task_validation = _find_and_validate_tasks(context, wip_number)
     if not task_validation["success"]: return task_validation
     subtask_gid = task_validation["subtask_gid"]
     tag_gid = context.gids.get("HEATER_SWAP_TAGS", [None])[0]
     if not tag_gid: return {"success": False, "message": "Heater Board Replacement tag not found in config."}
+    log_op = _OperationSteps(include_errors=True)
     add_tag_result = context.client.add_tag_to_task(subtask_gid, tag_gid)
-    if not add_tag_result["success"]: return add_tag_result
+    log_op("Adding tag 'Heater Board Replacement'", add_tag_result)
+    if not log_op.success: return dict(add_tag_result, steps=log_op.steps)
     comment = f"Heater Board Swapped ~{device_name}"
-    context.client.add_comment_to_task(subtask_gid, comment)
-    return {"success": True, "message": f"WIP {wip_number}: Added Heater Board Swapped tag."}
+    log_op("Adding comment", context.client.add_comment_to_task(subtask_gid, comment))
+    message = f"WIP {wip_number}: Added Heater Board Swapped tag." + (QUEUED_NOTE if log_op.queued else "")
+    return {"success": True, "queued": log_op.queued, "message": message, "steps": log_op.steps}
 
 def process_device_cleaned(context, wip_number, device_name):
-    # This function is correct and unchanged
     task_validation = _find_and_validate_tasks(context, wip_number)
     if not task_validation["success"]: return task_validation
     subtask_gid = task_validation["subtask_gid"]
     tag_gid = context.gids.get("CLEANED_TAG")
     if not tag_gid: return {"success": False, "message": "Tag 'Cleaned' not found in config."}
+    log_op = _OperationSteps(include_errors=True)
     add_tag_result = context.client.add_tag_to_task(subtask_gid, tag_gid)
-    if not add_tag_result["success"]: return add_tag_result
+    log_op("Adding tag 'Cleaned'", add_tag_result)
+    if not log_op.success: return dict(add_tag_result, steps=log_op.steps)
     comment = f"Device Cleaned ~{device_name}"
-    context.client.add_comment_to_task(subtask_gid, comment)
-    return {"success": True, "message": f"WIP {wip_number}: Added Cleaned tag."}
+    log_op("Adding comment", context.client.add_comment_to_task(subtask_gid, comment))
+    message = f"WIP {wip_number}: Added Cleaned tag." + (QUEUED_NOTE if log_op.queued else "")
+    return {"success": True, "queued": log_op.queued, "message": message, "steps": log_op.steps}
 
 def process_device_complete(context, uploaded_file_data, manual_wip, device_name):
     # This function is correct and unchanged
@@ -84,14 +138,9 @@ def process_device_complete(context, uploaded_file_data, manual_wip, device_name
         return {"success": False, "message": f"Could not find task for '{wip_to_search}'. Please provide WIP manually.", "fallback_needed": True}
     subtask_gid = task_validation["subtask_gid"]
     parent_gid = task_validation["parent_gid"]
-    parent_data_result = context.client.get_task_details(parent_gid, opt_fields="projects.gid")
-    parent_data = parent_data_result.get("data", {}).get("data", {})
-    is_amat_ags = any(p.get('gid') == context.gids.get("PROJECT_AMAT_AGS") for p in parent_data.get('projects', []))
-    all_ops_success, messages = True, []
-    def log_op(msg, res):
-        nonlocal all_ops_success
-        if not res["success"]: all_ops_success = False
-        messages.append(f"• {msg}: {'Success' if res['success'] else 'FAILED'}")
+    parent = context.client.get_task_details(parent_gid, fields=("project_gids",)).get("task") or Task()
+    is_amat_ags = parent.in_project(context.gids.get("PROJECT_AMAT_AGS"))
+    log_op = _OperationSteps()
     log_op("Uploading certificate", context.client.upload_attachment(subtask_gid, uploaded_file_data))
     log_op(f"Assigning subtask", context.client.assign_task_to_user(subtask_gid, context.gids.get("SHARED_SUBTASK_ASSIGNEE")))
     log_op(f"Adding tag 'Device Calibrated'", context.client.add_tag_to_task(subtask_gid, context.gids.get("DEVICE_COMPLETE_TAG")))
@@ -103,19 +152,15 @@ def process_device_complete(context, uploaded_file_data, manual_wip, device_name
         if ready_for_buyer_gid:
             log_op("Moving parent task", context.client.move_task_to_section(parent_gid, ready_for_buyer_gid))
     summary = f"Device Complete for '{wip_to_search}' finished."
-    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(messages)
-    return {"success": all_ops_success, "message": final_message}
+    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(log_op.messages)
+    return {"success": log_op.success, "queued": log_op.queued, "message": final_message, "steps": log_op.steps}
 
 def process_dog_operation(context, wip_number, reason_data, order_hold_reason, device_name):
     # This function is correct and unchanged
     task_validation = _find_and_validate_tasks(context, wip_number)
     if not task_validation["success"]: return task_validation
     subtask_gid = task_validation["subtask_gid"]
-    all_ops_success, messages = True, []
-    def log_op(msg, res):
-        nonlocal all_ops_success
-        if not res["success"]: all_ops_success = False
-        messages.append(f"• {msg}: {'Success' if res['success'] else 'FAILED'}")
+    log_op = _OperationSteps()
     if order_hold_reason:
         comment = f"AUTO: ORDER HOLD - {order_hold_reason} ~{device_name}"
         log_op("Assigning to Susan Hearon", context.client.assign_task_to_user(subtask_gid, context.gids.get("SUSAN_HEARON_USER")))
@@ -130,8 +175,8 @@ def process_dog_operation(context, wip_number, reason_data, order_hold_reason, d
             tag_gid = context.gids.get(tag_key)
             log_op(f"Adding tag '{reason_data['tag_name_to_add']}'", context.client.add_tag_to_task(subtask_gid, tag_gid))
     summary = f"Dog Operation for WIP {wip_number} finished."
-    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(messages)
-    return {"success": all_ops_success, "message": final_message}
+    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(log_op.messages)
+    return {"success": log_op.success, "queued": log_op.queued, "message": final_message, "steps": log_op.steps}
 
 def process_cor_operation(context, wip_number, reason_data, device_name):
     # This function is correct and unchanged
@@ -139,16 +184,10 @@ def process_cor_operation(context, wip_number, reason_data, device_name):
     if not task_validation["success"]: return task_validation
     subtask_gid = task_validation["subtask_gid"]
     parent_gid = task_validation["parent_gid"]
-    parent_data_result = context.client.get_task_details(parent_gid, opt_fields="name,projects.gid")
-    subtask_data_result = context.client.get_task_details(subtask_gid, opt_fields="name")
-    parent_data = parent_data_result.get("data", {}).get("data", {})
-    subtask_data = subtask_data_result.get("data", {}).get("data", {})
-    is_amat_ags = any(p.get('gid') == context.gids.get("PROJECT_AMAT_AGS") for p in parent_data.get('projects', []))
-    all_ops_success, messages = True, []
-    def log_op(msg, res):
-        nonlocal all_ops_success
-        if not res["success"]: all_ops_success = False
-        messages.append(f"• {msg}: {'Success' if res['success'] else 'FAILED'}")
+    parent = context.client.get_task_details(parent_gid, fields=("name", "project_gids")).get("task") or Task()
+    subtask = context.client.get_task_details(subtask_gid, fields=("name",)).get("task") or Task()
+    is_amat_ags = parent.in_project(context.gids.get("PROJECT_AMAT_AGS"))
+    log_op = _OperationSteps()
     comment = f"{reason_data['comment']} ~{device_name}"
     log_op("Adding reason comment", context.client.add_comment_to_task(subtask_gid, comment))
     if reason_data['tag_name_to_add']:
@@ -156,29 +195,24 @@ def process_cor_operation(context, wip_number, reason_data, device_name):
         tag_gid = context.gids.get(tag_key)
         log_op(f"Adding tag '{reason_data['tag_name_to_add']}'", context.client.add_tag_to_task(subtask_gid, tag_gid))
     log_op("Adding tag 'Return Unrepaired'", context.client.add_tag_to_task(subtask_gid, context.gids.get("COR_TAG")))
-    if not subtask_data.get('name', '').strip().upper().startswith("*COR*"):
-        log_op("Renaming subtask", context.client.change_task_name(subtask_gid, f"*COR* {subtask_data.get('name')}"))
+    if not subtask.name.strip().upper().startswith("*COR*"):
+        log_op("Renaming subtask", context.client.change_task_name(subtask_gid, f"*COR* {subtask.name}"))
     if is_amat_ags:
-        if not parent_data.get('name', '').strip().upper().startswith("*COR*"):
-            log_op("Renaming parent", context.client.change_task_name(parent_gid, f"*COR* {parent_data.get('name')}"))
+        if not parent.name.strip().upper().startswith("*COR*"):
+            log_op("Renaming parent", context.client.change_task_name(parent_gid, f"*COR* {parent.name}"))
         log_op("Assigning parent", context.client.assign_task_to_user(parent_gid, context.gids.get("ACCOUNT_MANAGER_ASSIGNEE")))
         log_op("Assigning subtask", context.client.assign_task_to_user(subtask_gid, context.gids.get("SHARED_SUBTASK_ASSIGNEE")))
         log_op("Moving parent", context.client.move_task_to_section(parent_gid, context.gids.get("NEEDS_COR_SECTION")))
     summary = f"COR Operation for WIP {wip_number} finished."
-    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(messages)
-    return {"success": all_ops_success, "message": final_message}
+    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(log_op.messages)
+    return {"success": log_op.success, "queued": log_op.queued, "message": final_message, "steps": log_op.steps}
 
 def process_custom_operation(context, wip_number, recipe, device_name):
     task_validation = _find_and_validate_tasks(context, wip_number)
     if not task_validation["success"]: return task_validation
     subtask_gid = task_validation["subtask_gid"]
     parent_gid = task_validation["parent_gid"]
-    all_ops_success, messages = True, []
-    def log_op(msg, res):
-        nonlocal all_ops_success
-        if not res["success"]: all_ops_success = False
-        status = 'Success' if res["success"] else f"FAILED: {res.get('message', 'Unknown')}"
-        messages.append(f"• {msg}: {status}")
+    log_op = _OperationSteps(include_errors=True)
     for action in recipe:
         action_type = action['type']; value = action['value']; target = action.get('target', 'subtask')
         target_gid = subtask_gid if target == 'subtask' else parent_gid
@@ -202,8 +236,8 @@ def process_custom_operation(context, wip_number, recipe, device_name):
 
     context.client.add_comment_to_task(subtask_gid, final_comment)
     summary = f"Custom operation for WIP {wip_number} finished."
-    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(messages)
-    return {"success": all_ops_success, "message": final_message}
+    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(log_op.messages)
+    return {"success": log_op.success, "queued": log_op.queued, "message": final_message, "steps": log_op.steps}
 
 def process_move_cart(context, cart_tag_name, recipe, device_name):
     # This function is correct and unchanged
@@ -211,12 +245,14 @@ def process_move_cart(context, cart_tag_name, recipe, device_name):
     if error_msg: return {"success": False, "message": error_msg}
     tasks_result = context.client.get_tasks_by_tag(cart_tag_gid)
     if not tasks_result["success"]: return tasks_result
-    tasks = tasks_result.get("data", {}).get("data", [])
+    tasks = tasks_result["tasks"]
     if not tasks: return {"success": False, "message": f"No tasks found with tag '{cart_tag_name}'."}
     success_count = 0; failed_tasks = []
+    log_op = _OperationSteps()
     for task in tasks:
-        wip_name = task.get('name', '')
+        wip_name = task.name
         result = process_custom_operation(context, wip_name, recipe, device_name)
+        log_op(f"WIP {wip_name}", result)
         if result["success"]: success_count += 1
         else: failed_tasks.append(f"• {wip_name}: {result['message']}")
     summary = f"Move Cart '{cart_tag_name}' complete. Success: {success_count}, Failed: {len(failed_tasks)}."
@@ -224,4 +260,38 @@ def process_move_cart(context, cart_tag_name, recipe, device_name):
         final_message = f"{summary}\n\n--- Failures ---\n" + "\n".join(failed_tasks)
     else:
         final_message = summary
-    return {"success": success_count > 0, "message": final_message}
\ No newline at end of file
+    return {"success": success_count > 0, "queued": log_op.queued, "message": final_message, "steps": log_op.steps}
+
+def process_wip_batch(context, wip_numbers, operation_func, *args, max_workers=DEFAULT_BATCH_WORKERS, on_result=None):
+    """
+    Runs a single-WIP operation for every WIP on a bounded thread pool; `args` ends with the device name.
+    `on_result(wip, result, duration)` is called on the calling thread as each WIP finishes. The summary's
+    `results` holds (wip, result, duration) for every WIP in input order, so each can be journaled on its own.
+    """
+    session_id = context.client.current_session()
+
+    def run_one(wip_number):
+        context.client.bind_session(session_id)
+        started = time.monotonic()
+        try:
+            result = operation_func(context, wip_number, *args)
+        except Exception as e:
+            logging.error(f"Unhandled error for WIP {wip_number}: {e}", exc_info=True)
+            result = {"success": False, "message": f"Unhandled error: {e}"}
+        return result, time.monotonic() - started
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wip-batch") as executor:
+        futures = {executor.submit(run_one, wip_number): wip_number for wip_number in wip_numbers}
+        for future in as_completed(futures):
+            wip_number = futures[future]
+            results[wip_number] = future.result()
+            if on_result: on_result(wip_number, *results[wip_number])
+    log_op = _OperationSteps(include_errors=True)
+    for wip_number in wip_numbers:
+        log_op(f"WIP {wip_number}", results[wip_number][0])
+    failed = sum(1 for step in log_op.steps if not step["success"] and not step["queued"])
+    summary = f"Batch of {len(wip_numbers)} WIPs finished. Success: {len(wip_numbers) - failed}, Failed: {failed}."
+    final_message = f"{summary}\n\n--- Details ---\n" + "\n".join(log_op.messages)
+    return {"success": log_op.success, "queued": log_op.queued, "message": final_message,
+            "results": [(wip_number, *results[wip_number]) for wip_number in wip_numbers]}